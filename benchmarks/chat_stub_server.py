@@ -0,0 +1,140 @@
+# chat_stub_server.py
+
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from prompt_builder import count_tokens
+
+
+CRITERIA = ["Financial Health", "Valuation", "Margin of Safety", "Profitability", "Dividends", "Debt",
+            "Return on Equity", "Capital Expenditures", "Undervalued or Overvalued", "Growth Potential"]
+
+# Symbol headers of a batch prompt (see `build_batch_prompt`) and the symbol of a single-company prompt
+_batch_symbol_pattern = re.compile(r"^### (\S+)$", re.MULTILINE)
+_single_symbol_pattern = re.compile(r"All (\S+)'s")
+
+
+class ChatCompletionStub:
+    """
+    Local HTTP server answering OpenAI chat completion requests (POST {base_url}/chat/completions) with
+    evaluations in the format the prompts ask for.
+
+    Single-company prompts get a `data = {...}` answer, batch prompts a JSON object keyed by symbol. Symbols in
+    `invalid_symbols` get a batch answer without 'Reasoning', so the evaluator has to fall back to a single
+    request for them. Every `throttle_every`-th request is answered with HTTP 429 and the API's rate limit
+    error, and `latency` adds a fixed server delay per request. Every request is recorded in `request_log` as
+    (arrival time (time.monotonic), prompt tokens (`count_tokens`), symbols, "single" / "batch" / "throttled").
+    Use as a context manager; `base_url` is passed to `LLMEvaluator` as api_base.
+    """
+    def __init__(self, latency = 0.0, throttle_every = None, invalid_symbols = ()):
+
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.invalid_symbols = set(invalid_symbols)
+        self.requests = 0
+        self.throttled = 0
+        self.request_log = []
+        self.lock = threading.Lock()
+        self.server = None
+        self.base_url = None
+
+    @staticmethod
+    def evaluation(symbol, valid = True):
+        # Deterministic scores per symbol
+        rng = random.Random(symbol)
+        scores = [rng.randint(1, 10) for _ in CRITERIA]
+        evaluation = {
+            "Investment Criteria": CRITERIA,
+            "Score": scores,
+            "Positive/Negative": ["Positive" if score > 5 else "Negative" for score in scores],
+            "Reasoning": [f"Synthetic reasoning for {criterion} of {symbol}." for criterion in CRITERIA],
+        }
+        if not valid:
+            del evaluation["Reasoning"]
+        return evaluation
+
+    def respond(self, request):
+        """
+        Returns (HTTP status, response dict) for a decoded chat completion request.
+        """
+        prompt = request["messages"][-1]["content"]
+        batch_symbols = _batch_symbol_pattern.findall(prompt)
+        symbols = batch_symbols or _single_symbol_pattern.findall(prompt)[:1]
+        prompt_tokens = count_tokens(prompt)
+
+        with self.lock:
+            self.requests += 1
+            throttled = self.throttle_every is not None and self.requests % self.throttle_every == 0
+            self.throttled += throttled
+            kind = "throttled" if throttled else "batch" if batch_symbols else "single"
+            self.request_log.append((time.monotonic(), prompt_tokens, symbols, kind))
+
+        if throttled:
+            return 429, {"error": {"message": "Rate limit reached for requests. Please try again in 20ms.",
+                                   "type": "requests", "param": None, "code": "rate_limit_exceeded"}}
+
+        if batch_symbols:
+            content = json.dumps({symbol: self.evaluation(symbol, symbol not in self.invalid_symbols)
+                                  for symbol in batch_symbols})
+        else:
+            content = "data = " + json.dumps(self.evaluation(symbols[0] if symbols else ""))
+
+        return 200, {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": count_tokens(content),
+                      "total_tokens": prompt_tokens + count_tokens(content)},
+        }
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Without TCP_NODELAY small keep-alive responses wait for the client's delayed ACK
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, payload = stub.respond(request)
+                body = json.dumps(payload).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
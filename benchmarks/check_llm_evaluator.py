@@ -0,0 +1,154 @@
+# check_llm_evaluator.py
+"""
+Checks the concurrent LLM evaluation stage against the local `ChatCompletionStub`, without an OpenAI account.
+
+`LLMEvaluator.evaluate` scores `--companies` synthetic companies twice:
+- one company per request, with every `--throttle-every`-th request answered with HTTP 429. Every company must
+  be answered, every 429 retried, and the requests and tokens seen by the server must never exceed the
+  requests-per-minute and tokens-per-minute token buckets. Unless `--tokens-per-minute` is given, the budget
+  is 80% of the tokens the run needs, so the tokens-per-minute bucket has to hold the run back.
+- in batches of `--batch-size` companies, where every tenth company gets an answer without 'Reasoning'.
+  Exactly those companies must fall back to a single-company request, and every answer must parse.
+
+The exit status is 1 when a check fails.
+
+Usage:
+    python benchmarks/check_llm_evaluator.py
+    python benchmarks/check_llm_evaluator.py --companies 100 --requests-per-minute 300 --latency 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_PATH))
+
+import numpy as np
+import openai
+
+from synthetic_data import SyntheticAlphaVantage
+from chat_stub_server import ChatCompletionStub
+from llm_evaluator import LLMEvaluator
+from prompt_builder import build_company_context, count_tokens
+from prompt_engineering import prompt_task, prompt_task_support, type_response, format_response
+from response_parser import parse_response
+
+
+def max_bucket_excess(arrival_times, weights, rate, burst):
+    """
+    Largest amount by which the requests of any time window exceed what a token bucket with this rate
+    (per second) and burst lets through in that window, i.e. burst + rate * window length. At most 0 when the
+    requests conform to the bucket.
+    """
+    order = np.argsort(arrival_times)
+    times = np.asarray(arrival_times, dtype = float)[order]
+    cumulative = np.concatenate([[0.0], np.cumsum(np.asarray(weights, dtype = float)[order])])
+    excess = -np.inf
+    for first in range(len(times)):
+        sent = cumulative[first + 1:] - cumulative[first]
+        excess = max(excess, np.max(sent - burst - rate * (times[first:] - times[first])))
+    return excess
+
+
+def build_inputs(companies):
+    # Single-company prompts and batch contexts of synthetic companies, built like main does
+    generator = SyntheticAlphaVantage()
+    prompts = {}
+    contexts = {}
+    for symbol in generator.symbols(companies):
+        question = f"{prompt_task} {symbol}, {prompt_task_support}. All {symbol}'s {type_response}: {format_response}"
+        contexts[symbol] = build_company_context(sections = {"Overview": [generator.overview(symbol)]})
+        prompts[symbol] = question + "\n" + contexts[symbol]
+    return prompts, contexts
+
+
+def evaluate(stub, prompts, requests_per_minute, tokens_per_minute, args, **kwargs):
+    llm_evaluator = LLMEvaluator(model = "gpt-4", max_concurrency = args.concurrency,
+                                 requests_per_minute = requests_per_minute, tokens_per_minute = tokens_per_minute,
+                                 max_response_tokens = args.max_response_tokens, api_base = stub.base_url)
+    # The stub asks to retry within milliseconds, so the check need not wait the production backoff
+    llm_evaluator.backoff_base_delay = 0.05
+    llm_evaluator.backoff_max_delay = 0.5
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return dict(llm_evaluator.evaluate(prompts = prompts, **kwargs))
+
+
+def parses(results):
+    try:
+        for content in results.values():
+            parse_response(content)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Checks the LLM evaluation stage against a local chat completion stub.")
+    parser.add_argument("--companies", type = int, default = 60)
+    parser.add_argument("--concurrency", type = int, default = 8)
+    parser.add_argument("--requests-per-minute", type = float, default = 600)
+    parser.add_argument("--tokens-per-minute", type = float, help = "Default is 80%% of the tokens of the single run.")
+    parser.add_argument("--max-response-tokens", type = int, default = 200)
+    parser.add_argument("--throttle-every", type = int, default = 7, help = "Answer every n-th request with HTTP 429.")
+    parser.add_argument("--batch-size", type = int, default = 4)
+    parser.add_argument("--latency", type = float, default = 0.02, help = "Stub server delay per request in seconds.")
+    args = parser.parse_args()
+
+    # openai refuses to send a request without a key; the stub ignores it
+    openai.api_key = openai.api_key or "check"
+    prompts, contexts = build_inputs(args.companies)
+    tokens_needed = sum(count_tokens(prompt) + args.max_response_tokens for prompt in prompts.values())
+    tokens_per_minute = args.tokens_per_minute or int(tokens_needed * 0.8)
+    checks = []
+
+    with ChatCompletionStub(latency = args.latency, throttle_every = args.throttle_every) as stub:
+        results = evaluate(stub, prompts, args.requests_per_minute, tokens_per_minute, args)
+        request_log = list(stub.request_log)
+
+    times = [entry[0] for entry in request_log]
+    weights = [entry[1] + args.max_response_tokens for entry in request_log]
+    duration = max(times) - min(times)
+    # One request of slack for the time between taking the tokens and arriving at the server
+    request_excess = max_bucket_excess(times, [1] * len(times), args.requests_per_minute / 60, 1)
+    token_excess = max_bucket_excess(times, weights, tokens_per_minute / 60, tokens_per_minute)
+    # After the first minute of tokens (the bucket's burst) the run is paced by the refill rate
+    tokens_bound_duration = max(0.0, (sum(weights) - tokens_per_minute) / (tokens_per_minute / 60))
+
+    print(f"Single requests: {len(request_log)} requests ({stub.throttled} answered with 429) in {duration:.1f} s, "
+          f"{len(results)} of {len(prompts)} companies answered. Budget {args.requests_per_minute:.0f} requests and "
+          f"{tokens_per_minute:.0f} tokens per minute, {sum(weights)} tokens sent.")
+    checks.append(("answers every company", len(results) == len(prompts) and parses(results)))
+    checks.append(("retries every 429", stub.throttled > 0 and len(request_log) == len(prompts) + stub.throttled))
+    checks.append(("stays within the requests per minute", request_excess <= 1))
+    checks.append(("stays within the tokens per minute", token_excess <= max(weights)))
+    if args.tokens_per_minute is None:
+        checks.append(("is paced by the tokens per minute", duration >= tokens_bound_duration * 0.95))
+
+    invalid_symbols = list(prompts)[::10]
+    with ChatCompletionStub(latency = args.latency, invalid_symbols = invalid_symbols) as stub:
+        results = evaluate(stub, prompts, args.requests_per_minute, 10 ** 7, args, contexts = contexts,
+                           batch_size = args.batch_size)
+        request_log = list(stub.request_log)
+
+    batches = [entry[2] for entry in request_log if entry[3] == "batch"]
+    single_symbols = [symbol for entry in request_log if entry[3] == "single" for symbol in entry[2]]
+
+    print(f"Batches: {len(batches)} batch requests of up to {args.batch_size} companies, {len(single_symbols)} "
+          f"single fallbacks for {len(invalid_symbols)} invalid answers, {len(results)} of {len(prompts)} companies answered.")
+    checks.append(("answers every company in batch mode", len(results) == len(prompts) and parses(results)))
+    checks.append(("batches every company once", sorted(symbol for batch in batches for symbol in batch) == sorted(prompts)
+                   and max(len(batch) for batch in batches) <= args.batch_size))
+    checks.append(("falls back to single requests for invalid answers only", sorted(single_symbols) == sorted(invalid_symbols)))
+
+    for name, passed in checks:
+        print(f"  {'PASS' if passed else 'FAIL'}: {name}")
+
+    if not all(passed for _, passed in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# check_rate_limit.py
+"""
+Checks that the concurrent fundamental data fetch saturates, but never exceeds, the configured request rate.
+
+`DataFetcher.fetch_fundamental_data` fetches `--symbols` OVERVIEW payloads from the local `AlphaVantageStub`
+with `--workers` threads sharing the token bucket. The request arrival times seen by the server must show:
+- an overall rate within `--tolerance` of `--requests-per-minute`, i.e. the workers keep the bucket saturated;
+- no sliding one-second window with more requests than the bucket allows (its rate plus the burst of one).
+
+The exit status is 1 when either check fails.
+
+Usage:
+    python benchmarks/check_rate_limit.py
+    python benchmarks/check_rate_limit.py --requests-per-minute 300 --symbols 100 --latency 0.2
+"""
+
+import argparse
+import bisect
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_PATH))
+
+from synthetic_data import SyntheticAlphaVantage
+from stub_server import AlphaVantageStub
+from data_fetcher import DataFetcher
+
+
+def max_requests_per_window(request_times, window = 1.0):
+    # Largest number of requests arriving within any `window` seconds
+    request_times = sorted(request_times)
+    return max(bisect.bisect_left(request_times, start + window) - position
+               for position, start in enumerate(request_times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Checks the fetch throughput against the configured rate limit.")
+    parser.add_argument("--requests-per-minute", type = float, default = 600)
+    parser.add_argument("--symbols", type = int, default = 200)
+    parser.add_argument("--workers", type = int, default = 8)
+    parser.add_argument("--latency", type = float, default = 0.05, help = "Stub server delay per request in seconds.")
+    parser.add_argument("--tolerance", type = float, default = 0.05, help = "Allowed shortfall of the overall rate.")
+    args = parser.parse_args()
+
+    generator = SyntheticAlphaVantage()
+    symbols_list = generator.symbols(args.symbols)
+    data_path = tempfile.mkdtemp(prefix = "rate_limit_")
+
+    try:
+        with AlphaVantageStub(generator, latency = args.latency) as stub:
+            data_fetcher = DataFetcher(api_key = "benchmark", base_url = stub.base_url, data_path = data_path,
+                                       requests_per_minute = args.requests_per_minute, max_workers = args.workers)
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                data = data_fetcher.fetch_fundamental_data(symbols_list = symbols_list, fundamental_data = "OVERVIEW")
+            data_fetcher.http.close()
+            request_times = list(stub.request_times)
+    finally:
+        shutil.rmtree(data_path, ignore_errors = True)
+
+    # The first request takes the initial token, the remaining ones are paced by the refill rate
+    measured_per_minute = (len(request_times) - 1) / (max(request_times) - min(request_times)) * 60
+    allowed_per_second = args.requests_per_minute / 60 + 1
+    peak_per_second = max_requests_per_window(request_times)
+
+    saturated = measured_per_minute >= args.requests_per_minute * (1 - args.tolerance)
+    within_limit = measured_per_minute <= args.requests_per_minute * 1.01 and peak_per_second <= allowed_per_second
+    complete = len(data) == len(symbols_list)
+
+    print(f"{len(request_times)} requests with {args.workers} workers: {measured_per_minute:.1f} requests per minute "
+          f"(configured {args.requests_per_minute:.0f}), at most {peak_per_second} in one second "
+          f"(allowed {allowed_per_second:.1f}), {len(data)} of {len(symbols_list)} symbols fetched.")
+    for name, passed in (("saturates the limit", saturated), ("stays within the limit", within_limit),
+                         ("fetches every symbol", complete)):
+        print(f"  {'PASS' if passed else 'FAIL'}: {name}")
+
+    if not (saturated and within_limit and complete):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
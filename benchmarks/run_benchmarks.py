@@ -0,0 +1,477 @@
+# run_benchmarks.py
+"""
+Reproducible benchmarks of the data pipeline on synthetic Alpha Vantage data, without network access or API keys.
+
+Fundamental payloads and price series come from `SyntheticAlphaVantage`, and the fetch benchmarks run
+against the local `AlphaVantageStub` server. Every benchmark is repeated `--repeat` times, and the
+min/median/mean wall time is saved to benchmarks/results/<commit>.json. Pass `--compare` with an older result
+file to compare the minimum times (the least noisy estimate). The exit status is 1 when a benchmark is slower than the `--threshold`.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --symbols 500 --repeat 3 --only process_
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<older commit>.json
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_PATH))
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import SyntheticAlphaVantage
+from stub_server import AlphaVantageStub
+from data_fetcher import DataFetcher
+from data_processing import DataProcessor
+from fundamental_pipeline import FundamentalPipeline
+from price_store import PriceStore, MAX_PARTITIONS_PER_WRITE
+from helpers import loads_clean, remove_unwanted_values
+from prompt_builder import build_company_context, count_tokens
+
+
+FUNDAMENTAL_FUNCTIONS = ["OVERVIEW", "INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW"]
+STATEMENT_FUNCTIONS = ["INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW"]
+PROCESSORS = {
+    "OVERVIEW": "overview",
+    "INCOME_STATEMENT": "income",
+    "BALANCE_SHEET": "balance_sheet",
+    "CASH_FLOW": "cash_flow",
+}
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark. The decorated function gets the `BenchmarkContext` and returns the callable to time.
+    The callable may return a dict of extra results (e.g. throughput), stored with the timings.
+    """
+    def decorator(function):
+        BENCHMARKS[name] = function
+        return function
+    return decorator
+
+
+class BenchmarkContext:
+    """
+    Synthetic data shared by the benchmarks, generated lazily once per run.
+    """
+    def __init__(self, symbols, fetch_symbols, price_symbols, seed, work_path):
+
+        self.generator = SyntheticAlphaVantage(seed = seed)
+        self.symbols = SyntheticAlphaVantage.symbols(symbols)
+        self.fetch_symbols = SyntheticAlphaVantage.symbols(fetch_symbols)
+        self.price_symbols = SyntheticAlphaVantage.symbols(price_symbols)
+        self.work_path = work_path
+        self.data_processor = DataProcessor()
+        self._texts = {}
+        self._payloads = {}
+        self._records = None
+        self._price_series = None
+
+    def texts(self, function):
+        # Raw response texts, as downloaded
+        if function not in self._texts:
+            self._texts[function] = [json.dumps(self.generator.fundamental(function, symbol)) for symbol in self.symbols]
+        return self._texts[function]
+
+    def payloads(self, function):
+        # Decoded responses, as read from the `FundamentalStore`
+        if function not in self._payloads:
+            self._payloads[function] = [loads_clean(text) for text in self.texts(function)]
+        return self._payloads[function]
+
+    def records(self):
+        # Symbol indexes of the processed data, as used by main to build the prompts
+        if self._records is None:
+            frames = {function: getattr(self.data_processor, f"process_fundamental_data_{PROCESSORS[function]}_frame")(
+                stock_data = self.payloads(function), threshold_date = "2019-01-01") for function in FUNDAMENTAL_FUNCTIONS}
+            frames["TRENDS"] = self.data_processor.process_trend_features_frame(
+                income_data = self.payloads("INCOME_STATEMENT"),
+                balance_data = self.payloads("BALANCE_SHEET"),
+                cash_flow_data = self.payloads("CASH_FLOW"),
+            )
+            self._records = {name: self.data_processor.index_by_symbol(
+                stock_data = self.data_processor.frame_to_records(frame = frame), key = "Symbol")
+                for name, frame in frames.items()}
+        return self._records
+
+    def price_series(self):
+        # Daily time series ({date: {field: value}}) of the price symbols, as returned by `_get_time_series`
+        if self._price_series is None:
+            self._price_series = [self.generator.time_series("TIME_SERIES_DAILY_ADJUSTED", symbol)["Time Series (Daily)"]
+                                  for symbol in self.price_symbols]
+        return self._price_series
+
+    def path(self, name):
+        # Empty scratch directory
+        path = os.path.join(self.work_path, name)
+        shutil.rmtree(path, ignore_errors = True)
+        os.makedirs(path)
+        return path
+
+
+@benchmark("loads_clean")
+def bench_loads_clean(context):
+    texts = context.texts("INCOME_STATEMENT")
+    size = sum(len(text) for text in texts)
+
+    def run():
+        start = time.perf_counter()
+        for text in texts:
+            loads_clean(text)
+        return {"megabytes_per_second": size / 1e6 / (time.perf_counter() - start)}
+    return run
+
+
+@benchmark("json_loads_remove_unwanted_values")
+def bench_json_loads(context):
+    # Baseline of loads_clean: decoding, then cleaning the decoded dict in a second pass
+    texts = context.texts("INCOME_STATEMENT")
+    size = sum(len(text) for text in texts)
+
+    def run():
+        start = time.perf_counter()
+        for text in texts:
+            remove_unwanted_values(json.loads(text))
+        return {"megabytes_per_second": size / 1e6 / (time.perf_counter() - start)}
+    return run
+
+
+def register_processor_benchmarks():
+    for function, processor in PROCESSORS.items():
+        for suffix in ("", "_frame"):
+
+            def make(context, function = function, method = f"process_fundamental_data_{processor}{suffix}"):
+                stock_data = context.payloads(function)
+                process = getattr(context.data_processor, method)
+                return lambda: {"rows": len(process(stock_data = stock_data, threshold_date = "2019-01-01"))}
+
+            benchmark(f"process_{processor}{suffix}")(make)
+
+
+register_processor_benchmarks()
+
+
+@benchmark("process_trend_features_frame")
+def bench_trend_features(context):
+    payloads = {function: context.payloads(function) for function in STATEMENT_FUNCTIONS}
+
+    def run():
+        frame = context.data_processor.process_trend_features_frame(
+            income_data = payloads["INCOME_STATEMENT"],
+            balance_data = payloads["BALANCE_SHEET"],
+            cash_flow_data = payloads["CASH_FLOW"],
+        )
+        return {"rows": len(frame)}
+    return run
+
+
+def company_data_lookups(context, symbols, records):
+    # Looks up every section of every symbol and returns the callable to time
+    data_fetcher = DataFetcher(api_key = "benchmark", data_path = context.path("company_data"))
+    lookups = len(symbols) * len(records)
+
+    def run():
+        found = 0
+        start = time.perf_counter()
+        for symbol in symbols:
+            for stock_data in records.values():
+                found += len(data_fetcher.fetch_company_data_by_key(stock_data = stock_data, key = "Symbol",
+                                                                    company_symbol = symbol))
+        return {"records": found, "microseconds_per_lookup": (time.perf_counter() - start) / lookups * 1e6}
+    return run
+
+
+@benchmark("fetch_company_data_by_key")
+def bench_fetch_company_data_by_key(context):
+    # Symbol indexes built with `DataProcessor.index_by_symbol`, looked up in O(1)
+    return company_data_lookups(context, context.symbols, context.records())
+
+
+@benchmark("fetch_company_data_by_key_list_scan")
+def bench_fetch_company_data_by_key_list_scan(context):
+    # Plain record lists, scanned linearly as before the symbol indexes. Every lookup scans all symbols,
+    # so only the first 200 symbols are looked up; compare microseconds_per_lookup with the indexed benchmark
+    records = {name: [record for stock_data in index.values() for record in stock_data]
+               for name, index in context.records().items()}
+    return company_data_lookups(context, context.symbols[:200], records)
+
+
+PROMPT_TITLES = {"OVERVIEW": "Overview", "INCOME_STATEMENT": "Income statement", "BALANCE_SHEET": "Balance sheet",
+                 "CASH_FLOW": "Cash flow", "TRENDS": "Multi-year trends"}
+
+
+def prompt_payload_benchmark(context, build):
+    # Times build(symbol, sections) over all symbols; the tokens per company are counted once, outside the timing
+    records = context.records()
+    sections = {symbol: {PROMPT_TITLES[name]: stock_data.get(symbol, []) for name, stock_data in records.items()}
+                for symbol in context.symbols}
+    tokens = sum(count_tokens(build(symbol, sections[symbol])) for symbol in context.symbols)
+    extras = {"tokens_per_company": tokens / len(context.symbols)}
+
+    def run():
+        for symbol in context.symbols:
+            build(symbol, sections[symbol])
+        return extras
+    return run
+
+
+@benchmark("build_company_context")
+def bench_build_company_context(context):
+    return prompt_payload_benchmark(context, lambda symbol, sections: build_company_context(sections = sections,
+                                                                                            max_tokens = 1500))
+
+
+@benchmark("prompt_payload_repr")
+def bench_prompt_payload_repr(context):
+    # Prompt payload before `build_company_context`: the Python repr of the record lists of every section
+    return prompt_payload_benchmark(context, lambda symbol, sections: str(list(sections.values())))
+
+
+@benchmark("fetch_fundamentals_bundle")
+def bench_fetch_fundamentals_bundle(context):
+    def run():
+        data_fetcher = DataFetcher(api_key = "benchmark", base_url = context.stub.base_url,
+                                   data_path = context.path("fundamentals"), requests_per_minute = 10 ** 6)
+        data = data_fetcher.fetch_fundamentals_bundle(symbols_list = context.fetch_symbols)
+        data_fetcher.http.close()
+        return {"responses": sum(len(payloads) for payloads in data.values())}
+    return run
+
+
+@benchmark("fetch_latest_stock_price_vol")
+def bench_fetch_latest_stock_price_vol(context):
+    def run():
+        data_fetcher = DataFetcher(api_key = "benchmark", base_url = context.stub.base_url,
+                                   data_path = context.path("prices"), requests_per_minute = 10 ** 6)
+        df_stocks = data_fetcher.fetch_latest_stock_price_vol(symbols_list = context.fetch_symbols, period = "daily",
+                                                              max_stock_price = float("inf"))
+        data_fetcher.http.close()
+        return {"rows": len(df_stocks)}
+    return run
+
+
+@benchmark("price_collector")
+def bench_price_collector(context):
+    # Price ingestion of `_get_stock_price_vol`: one typed frame per symbol, concatenated once
+    data_fetcher = DataFetcher(api_key = "benchmark", data_path = context.path("price_collector"))
+    symbols = context.price_symbols
+    series = context.price_series()
+
+    def run():
+        start = time.perf_counter()
+        frames = [data_fetcher._price_frame(data) for data in series]
+        df_stocks = data_fetcher._concat_price_frames(frames, symbols, symbols)
+        return {"rows": len(df_stocks), "milliseconds_per_symbol": (time.perf_counter() - start) / len(symbols) * 1e3}
+    return run
+
+
+@benchmark("price_concat_loop")
+def bench_price_concat_loop(context):
+    # Price ingestion before the collector: a frame converted per symbol and appended to the growing result
+    # with pd.concat, which copies everything collected so far. The time per symbol grows with the number of
+    # symbols, so only the first 1000 are run; compare milliseconds_per_symbol with price_collector, which
+    # understates the gap at the full universe
+    symbols = context.price_symbols[:1000]
+    series = context.price_series()[:1000]
+
+    def run():
+        start = time.perf_counter()
+        results = pd.DataFrame()
+        for symbol, data in zip(symbols, series):
+            data = pd.DataFrame(data).T
+            data.rename(columns = {"5. adjusted close": "stock_price_close", "6. volume": "trading_volume"}, inplace = True)
+            data = data.loc[:, ["stock_price_close", "trading_volume"]]
+            data.loc[:, "trading_date"] = pd.to_datetime(data.index)
+            data.loc[:, "company"] = symbol
+            data.reset_index(drop = True, inplace = True)
+            results = pd.concat([results, data], axis = 0)
+        return {"rows": len(results), "milliseconds_per_symbol": (time.perf_counter() - start) / len(symbols) * 1e3}
+    return run
+
+
+@benchmark("price_store_write")
+def bench_price_store_write(context):
+    # Full write of the daily prices of every symbol into an empty store, then a check that every symbol was
+    # stored. With the default --symbols this is more symbols than pyarrow writes in one call.
+    data_fetcher = DataFetcher(api_key = "benchmark", data_path = context.path("price_frames"))
+    frames = [data_fetcher._price_frame(context.generator.time_series("TIME_SERIES_DAILY_ADJUSTED", symbol, bars = 60)
+                                        ["Time Series (Daily)"]) for symbol in context.symbols]
+    df_stocks = data_fetcher._concat_price_frames(frames, context.symbols, context.symbols)
+
+    def run():
+        price_store = PriceStore(context.path("price_store"))
+        price_store.write(df_stocks, "daily")
+        stored = len(price_store.load_latest(period = "daily"))
+        if stored != len(context.symbols):
+            raise RuntimeError(f"{stored} of {len(context.symbols)} symbols stored")
+        return {"symbols": stored, "writes": -(-stored // MAX_PARTITIONS_PER_WRITE)}
+    return run
+
+
+@benchmark("fundamental_pipeline")
+def bench_fundamental_pipeline(context):
+    # Streaming store -> process -> Parquet run over a populated store, with the traced peak memory of one run
+    data_path = context.path("pipeline")
+    data_fetcher = DataFetcher(api_key = "benchmark", base_url = context.stub.base_url, data_path = data_path)
+    for function in FUNDAMENTAL_FUNCTIONS:
+        for symbol, payload in zip(context.symbols, context.payloads(function)):
+            data_fetcher.fundamental_store.put(symbol, function, payload)
+    pipeline = FundamentalPipeline(data_fetcher, context.data_processor, os.path.join(data_path, "processed"))
+
+    def run():
+        return {"rows": sum(pipeline.run(symbols_list = context.symbols, functions = STATEMENT_FUNCTIONS).values())}
+
+    tracemalloc.start()
+    run()
+    context.peak_memory_megabytes = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return run
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True,
+                                cwd = BENCHMARKS_PATH, check = True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output = True,
+                               text = True, cwd = BENCHMARKS_PATH).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(names, context, repeat):
+    """
+    Runs the named benchmarks and returns {name: timings and extra results}. Output of the measured code
+    (prints, progress bars) is discarded.
+    """
+    results = {}
+    for name in names:
+        timings = []
+        extras = {}
+        context.peak_memory_megabytes = None
+
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            run = BENCHMARKS[name](context)
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter()
+                extras = run() or {}
+                timings.append(time.perf_counter() - start)
+
+        results[name] = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.mean(timings),
+            "runs": timings,
+            **extras,
+        }
+        if context.peak_memory_megabytes is not None:
+            results[name]["peak_memory_megabytes"] = context.peak_memory_megabytes
+
+        extra_text = ", ".join(f"{key} {value:,.1f}" if isinstance(value, float) else f"{key} {value:,}"
+                               for key, value in extras.items())
+        print(f"{name:40s} median {results[name]['median'] * 1000:10.1f} ms  min {results[name]['min'] * 1000:10.1f} ms"
+              + (f"  ({extra_text})" if extra_text else ""))
+
+    return results
+
+
+def compare(results, meta, baseline, threshold):
+    """
+    Prints the minimum time of every benchmark against the baseline and returns the names slower than 1 + threshold.
+    """
+    regressions = []
+    print(f"\nComparison with {baseline['meta']['commit']} (threshold {threshold:.0%}):")
+    for key in ("symbols", "fetch_symbols", "price_symbols", "seed", "latency"):
+        if baseline["meta"].get(key) != meta[key]:
+            print(f"Warning: {key} differs from the baseline ({baseline['meta'].get(key)} vs {meta[key]})")
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            print(f"{name:40s} new")
+            continue
+        ratio = result["min"] / baseline["results"][name]["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:40s} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmarks on synthetic Alpha Vantage data.")
+    parser.add_argument("--symbols", type = int, default = 2000, help = "Symbols in the processing benchmarks.")
+    parser.add_argument("--fetch-symbols", type = int, default = 200, help = "Symbols in the fetch benchmarks.")
+    parser.add_argument("--price-symbols", type = int, default = 6000, help = "Symbols in the price ingestion benchmarks.")
+    parser.add_argument("--repeat", type = int, default = 5, help = "Runs per benchmark.")
+    parser.add_argument("--seed", type = int, default = 0, help = "Seed of the synthetic data.")
+    parser.add_argument("--only", default = "", help = "Run only the benchmarks whose name contains this text.")
+    parser.add_argument("--latency", type = float, default = 0.0, help = "Stub server delay per request in seconds.")
+    parser.add_argument("--output", help = "Result file. Default is benchmarks/results/<commit>.json.")
+    parser.add_argument("--compare", help = "Result file of an earlier run to compare with.")
+    parser.add_argument("--threshold", type = float, default = 0.10, help = "Slowdown reported as a regression.")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.only in name]
+    commit = git_commit()
+    work_path = tempfile.mkdtemp(prefix = "benchmarks_")
+    print(f"Running {len(names)} benchmarks on {args.symbols} symbols ({args.fetch_symbols} fetched) at {commit}...")
+
+    try:
+        context = BenchmarkContext(args.symbols, args.fetch_symbols, args.price_symbols, args.seed, work_path)
+        with AlphaVantageStub(context.generator, listing_size = args.fetch_symbols, latency = args.latency) as stub:
+            context.stub = stub
+            results = run_benchmarks(names, context, args.repeat)
+    finally:
+        shutil.rmtree(work_path, ignore_errors = True)
+
+    output = {
+        "meta": {
+            "commit": commit,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "symbols": args.symbols,
+            "fetch_symbols": args.fetch_symbols,
+            "price_symbols": args.price_symbols,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "latency": args.latency,
+        },
+        "results": results,
+    }
+    output_path = args.output or os.path.join(BENCHMARKS_PATH, "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok = True)
+    with open(output_path, "w") as file:
+        json.dump(output, file, indent = 2)
+    print(f"Results saved to {output_path}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, output["meta"], json.load(file), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
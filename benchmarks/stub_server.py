@@ -0,0 +1,123 @@
+# stub_server.py
+
+import gzip
+import json
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from synthetic_data import TIME_SERIES_KEYS
+
+
+class AlphaVantageStub:
+    """
+    Local HTTP server answering Alpha Vantage queries with `SyntheticAlphaVantage` payloads.
+
+    Serves LISTING_STATUS (CSV), OVERVIEW, INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW and the
+    TIME_SERIES_*_ADJUSTED functions over HTTP/1.1 keep-alive with gzip, like the real API. `latency` adds a
+    fixed server delay per request, and `max_requests_per_second` answers requests above that rate with the
+    API's "Note" throttle payload. The arrival time of every request is kept in `request_times`
+    (time.monotonic). Use as a context manager; `base_url` is passed to `DataFetcher`.
+    """
+    def __init__(self, generator, listing_size = 100, latency = 0.0, max_requests_per_second = None):
+
+        self.generator = generator
+        self.listing_size = listing_size
+        self.latency = latency
+        self.max_requests_per_second = max_requests_per_second
+        self.requests = 0
+        self.request_times = []
+        self.throttled = 0
+        self.window = []
+        self.lock = threading.Lock()
+        self.server = None
+        self.base_url = None
+
+    def _throttle(self):
+        # Sliding one-second window of accepted requests
+        now = time.monotonic()
+        with self.lock:
+            self.requests += 1
+            self.request_times.append(now)
+            if self.max_requests_per_second is None:
+                return False
+            self.window = [sent for sent in self.window if now - sent < 1]
+            if len(self.window) >= self.max_requests_per_second:
+                self.throttled += 1
+                return True
+            self.window.append(now)
+            return False
+
+    def respond(self, query):
+        """
+        Returns (content type, body) of the response to a parsed query string.
+        """
+        function = query.get("function", [""])[0]
+        symbol = query.get("symbol", [""])[0]
+
+        if self._throttle():
+            payload = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is "
+                               "5 calls per minute and 500 calls per day. Please visit "
+                               "https://www.alphavantage.co/premium/ if you would like to target a higher "
+                               "API call frequency."}
+        elif function == "LISTING_STATUS":
+            return "text/csv", self.generator.listing(self.listing_size).encode()
+        elif function in TIME_SERIES_KEYS:
+            bars = 100 if query.get("outputsize", ["full"])[0] == "compact" else 240
+            payload = self.generator.time_series(function, symbol, bars = bars)
+        elif function in ("OVERVIEW", "INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW"):
+            payload = self.generator.fundamental(function, symbol)
+        else:
+            payload = {"Error Message": "Invalid API call."}
+
+        return "application/json", json.dumps(payload).encode()
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Without TCP_NODELAY small keep-alive responses wait for the client's delayed ACK
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                content_type, body = stub.respond(parse_qs(urlparse(self.path).query))
+                compress = "gzip" in (self.headers.get("Accept-Encoding") or "")
+                if compress:
+                    body = gzip.compress(body, compresslevel = 1)
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if compress:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/query?"
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,203 @@
+# synthetic_data.py
+
+import datetime
+import random
+
+
+INCOME_FIELDS = ["grossProfit", "totalRevenue", "costOfRevenue", "operatingIncome", "netIncome", "ebit", "ebitda",
+                 "interestExpense", "incomeTaxExpense", "researchAndDevelopment"]
+BALANCE_SHEET_FIELDS = ["totalAssets", "totalLiabilities", "totalShareholderEquity", "totalCurrentAssets",
+                        "totalCurrentLiabilities", "retainedEarnings", "commonStockSharesOutstanding",
+                        "cashAndCashEquivalentsAtCarryingValue", "longTermDebt", "inventory"]
+CASH_FLOW_FIELDS = ["operatingCashflow", "capitalExpenditures", "dividendPayout", "netIncome",
+                    "paymentsForRepurchaseOfCommonStock", "depreciationDepletionAndAmortization"]
+SECTORS = ["TECHNOLOGY", "FINANCE", "LIFE SCIENCES", "MANUFACTURING", "ENERGY & TRANSPORTATION", "TRADE & SERVICES"]
+TIME_SERIES_KEYS = {
+    "TIME_SERIES_DAILY_ADJUSTED": "Time Series (Daily)",
+    "TIME_SERIES_WEEKLY_ADJUSTED": "Weekly Adjusted Time Series",
+    "TIME_SERIES_MONTHLY_ADJUSTED": "Monthly Adjusted Time Series",
+}
+# Alpha Vantage reports missing values as these strings
+SENTINELS = ["None", "-", "0"]
+
+
+class SyntheticAlphaVantage:
+    """
+    Generator of realistic Alpha Vantage payloads for N synthetic symbols (S0, S1, ...).
+
+    Every payload is a function of (seed, symbol), so repeated runs and the stub server produce identical
+    data. Values are strings like the real API, companies grow (or shrink) at their own rate with noise,
+    and `sentinel_share` of the values are 'None', '-' or '0' to exercise the cleaning paths.
+    """
+    def __init__(self, seed = 0, annual_reports = 10, quarterly_reports = 20, sentinel_share = 0.03,
+                 last_fiscal_date = "2023-12-31"):
+
+        self.seed = seed
+        self.annual_reports = annual_reports
+        self.quarterly_reports = quarterly_reports
+        self.sentinel_share = sentinel_share
+        self.last_fiscal_date = datetime.date.fromisoformat(last_fiscal_date)
+
+    @staticmethod
+    def symbols(n):
+        return [f"S{i}" for i in range(n)]
+
+    def _random(self, symbol, function):
+        return random.Random(f"{self.seed}-{symbol}-{function}")
+
+    def _value(self, rng, value):
+        if rng.random() < self.sentinel_share:
+            return rng.choice(SENTINELS)
+        return str(int(value))
+
+    def _company(self, symbol):
+        # Size, growth and margins of a company, shared by all its payloads
+        rng = self._random(symbol, "company")
+        return {
+            "revenue": rng.uniform(5e7, 5e10),
+            "growth": rng.uniform(-0.1, 0.3),
+            "gross_margin": rng.uniform(0.1, 0.8),
+            "net_margin": rng.uniform(-0.2, 0.3),
+            "shares": rng.uniform(1e7, 5e9),
+            "sector": rng.choice(SECTORS),
+            "price": rng.uniform(1, 500),
+        }
+
+    def _fiscal_dates(self, count, months):
+        dates = []
+        year, month = self.last_fiscal_date.year, self.last_fiscal_date.month
+        for _ in range(count):
+            day = (datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days = 1))
+            dates.append(day.isoformat())
+            month -= months
+            while month <= 0:
+                month += 12
+                year -= 1
+        return dates
+
+    def _reports(self, symbol, function, fields, count, months):
+        company = self._company(symbol)
+        rng = self._random(symbol, f"{function}-{months}")
+        scale = months / 12
+        reports = []
+        for age, fiscal_date in enumerate(self._fiscal_dates(count, months)):
+            revenue = company["revenue"] * scale * (1 + company["growth"]) ** (-age * scale) * rng.uniform(0.9, 1.1)
+            report = {"fiscalDateEnding": fiscal_date, "reportedCurrency": "USD"}
+            for field in fields:
+                if field == "totalRevenue":
+                    value = revenue
+                elif field == "grossProfit":
+                    value = revenue * company["gross_margin"]
+                elif field == "netIncome":
+                    value = revenue * company["net_margin"] * rng.uniform(0.7, 1.3)
+                elif field == "commonStockSharesOutstanding":
+                    value = company["shares"]
+                elif field in ("capitalExpenditures", "dividendPayout"):
+                    value = revenue * rng.uniform(0, 0.1)
+                else:
+                    value = revenue * rng.uniform(-0.2, 1.5)
+                report[field] = self._value(rng, value)
+            reports.append(report)
+        return reports
+
+    def _statement(self, symbol, function, fields):
+        return {
+            "symbol": symbol,
+            "annualReports": self._reports(symbol, function, fields, self.annual_reports, 12),
+            "quarterlyReports": self._reports(symbol, function, fields, self.quarterly_reports, 3),
+        }
+
+    def overview(self, symbol):
+        company = self._company(symbol)
+        rng = self._random(symbol, "OVERVIEW")
+        revenue = company["revenue"]
+        market_cap = company["shares"] * company["price"]
+        earnings = revenue * company["net_margin"]
+        return {
+            "Symbol": symbol,
+            "AssetType": "Common Stock",
+            "Name": f"Synthetic Company {symbol}",
+            "Exchange": rng.choice(["NYSE", "NASDAQ"]),
+            "Currency": "USD",
+            "Sector": company["sector"],
+            "Industry": "SYNTHETIC",
+            "FiscalYearEnd": "December",
+            "LatestQuarter": self.last_fiscal_date.isoformat(),
+            "MarketCapitalization": str(int(market_cap)),
+            "PERatio": f"{market_cap / earnings:.2f}" if earnings > 0 else "None",
+            "ForwardPE": self._value(rng, rng.uniform(5, 60)),
+            "PEGRatio": f"{rng.uniform(0.2, 4):.3f}",
+            "PriceToSalesRatioTTM": f"{market_cap / revenue:.3f}",
+            "PriceToBookRatio": self._value(rng, rng.uniform(0.5, 20)),
+            "EPS": f"{earnings / company['shares']:.2f}",
+            "ProfitMargin": f"{company['net_margin']:.3f}",
+            "DividendPerShare": f"{rng.uniform(0, 3):.2f}",
+            "DividendYield": rng.choice(["0", "None", f"{rng.uniform(0, 0.06):.4f}"]),
+            "ReturnOnAssetsTTM": f"{rng.uniform(-0.1, 0.2):.4f}",
+            "ReturnOnEquityTTM": f"{rng.uniform(-0.2, 0.4):.4f}",
+            "RevenueTTM": str(int(revenue)),
+            "GrossProfitTTM": str(int(revenue * company["gross_margin"])),
+            "RevenuePerShareTTM": f"{revenue / company['shares']:.3f}",
+            "Beta": f"{rng.uniform(0.3, 2):.3f}",
+            "52WeekHigh": f"{company['price'] * 1.3:.2f}",
+            "52WeekLow": f"{company['price'] * 0.7:.2f}",
+        }
+
+    def income_statement(self, symbol):
+        return self._statement(symbol, "INCOME_STATEMENT", INCOME_FIELDS)
+
+    def balance_sheet(self, symbol):
+        return self._statement(symbol, "BALANCE_SHEET", BALANCE_SHEET_FIELDS)
+
+    def cash_flow(self, symbol):
+        return self._statement(symbol, "CASH_FLOW", CASH_FLOW_FIELDS)
+
+    def fundamental(self, function, symbol):
+        """
+        Returns the payload of a fundamental data function (OVERVIEW, INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW).
+        """
+        generators = {
+            "OVERVIEW": self.overview,
+            "INCOME_STATEMENT": self.income_statement,
+            "BALANCE_SHEET": self.balance_sheet,
+            "CASH_FLOW": self.cash_flow,
+        }
+        return generators[function](symbol)
+
+    def time_series(self, function, symbol, bars = 240, last_date = None):
+        """
+        Returns a TIME_SERIES_*_ADJUSTED payload with `bars` bars ending at last_date (default today),
+        newest first like the API.
+        """
+        company = self._company(symbol)
+        rng = self._random(symbol, function)
+        step = {"TIME_SERIES_DAILY_ADJUSTED": 1, "TIME_SERIES_WEEKLY_ADJUSTED": 7, "TIME_SERIES_MONTHLY_ADJUSTED": 30}[function]
+        last_date = last_date or datetime.date.today()
+
+        series = {}
+        price = company["price"]
+        for bar in range(bars):
+            day = last_date - datetime.timedelta(days = step * bar)
+            close = price * rng.uniform(0.97, 1.03)
+            series[day.isoformat()] = {
+                "1. open": f"{price:.4f}",
+                "2. high": f"{max(price, close) * 1.01:.4f}",
+                "3. low": f"{min(price, close) * 0.99:.4f}",
+                "4. close": f"{close:.4f}",
+                "5. adjusted close": f"{close:.4f}",
+                "6. volume": str(int(rng.uniform(1e4, 1e7) * step)),
+                "7. dividend amount": "0.0000",
+                "8. split coefficient": "1.0",
+            }
+            price = close
+
+        return {"Meta Data": {"2. Symbol": symbol}, TIME_SERIES_KEYS[function]: series}
+
+    def listing(self, n):
+        """
+        Returns the LISTING_STATUS CSV text of the first n symbols.
+        """
+        lines = ["symbol,name,exchange,assetType,ipoDate,delistingDate,status"]
+        for symbol in self.symbols(n):
+            lines.append(f"{symbol},Synthetic Company {symbol},{self.overview(symbol)['Exchange']},Stock,2000-01-03,null,Active")
+        return "\n".join(lines) + "\n"
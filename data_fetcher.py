@@ -1,16 +1,25 @@
 # data_fetcher.py
 
-import requests
 import time
+import json
+import threading
 import pandas as pd
 import numpy as np
 import os
 import io
+import re
 import pickle
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from tqdm import tqdm
-from helpers import save_dataframe_to_csv
-
-from alpha_vantage.timeseries import TimeSeries
+from helpers import save_dataframe_to_csv, loads_clean
+from http_transport import HttpTransport
+from metrics import METRICS
+from rate_limiter import TokenBucket, AdaptiveRateController, backoff_delay
+from response_classifier import classify_response, OK, EMPTY, THROTTLED, ERROR, FAILED
+from fundamental_store import FundamentalStore
+from price_store import PriceStore
+from price_matrix import PriceMatrix
 
 class DataFetcher:
     """
@@ -18,97 +27,261 @@ class DataFetcher:
     """
     def __init__(self, api_key, 
                  base_url = "https://www.alphavantage.co/query?",
-                 data_path = "data/"):
+                 data_path = "data/",
+                 requests_per_minute = 75,
+                 max_workers = 8,
+                 max_attempts = 10,
+                 request_timeout = 30,
+                 connect_timeout = 5,
+                 min_requests_per_minute = 5):
         
         self.api_key = api_key
         self.base_url = base_url
         self.data_path = data_path
         self.listed_stocks_file_name = "listed_stocks.csv"
         self.latest_downloaded_stocks = "latest_downloaded_stocks.csv"
+        self.fundamental_store_file_name = "fundamentals.sqlite"
+        self.price_store_dir_name = "prices"
         self.outputsize = "full"
         self.stock_price_close = "5. adjusted close"
         self.trading_volume = "6. volume"
+        self.dividend_amount = "7. dividend amount"
+        self.split_coefficient = "8. split coefficient"
+        self.compact_max_gap_days = 100
+        self.time_series_functions = {
+            "daily": ("TIME_SERIES_DAILY_ADJUSTED", "Time Series (Daily)"),
+            "weekly": ("TIME_SERIES_WEEKLY_ADJUSTED", "Weekly Adjusted Time Series"),
+            "monthly": ("TIME_SERIES_MONTHLY_ADJUSTED", "Monthly Adjusted Time Series"),
+        }
+        self.fundamental_functions = ["OVERVIEW", "INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW"]
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.request_timeout = request_timeout
+        self.backoff_base_delay = 1.0
+        self.backoff_max_delay = 60.0
+        self.rate_limiter = TokenBucket(requests_per_minute)
+        self.rate_controller = AdaptiveRateController(self.rate_limiter,
+                                                      min_requests_per_minute = min_requests_per_minute,
+                                                      max_requests_per_minute = requests_per_minute)
+        self.request_stats = Counter()
+        self.request_stats_lock = threading.Lock()
+        self.http = HttpTransport(pool_size = max_workers, connect_timeout = connect_timeout, read_timeout = request_timeout)
+        self.fundamental_store = FundamentalStore(os.path.join(self.data_path, self.fundamental_store_file_name))
+        self.price_store = PriceStore(os.path.join(self.data_path, self.price_store_dir_name))
+
+    def _fetch_once(self, url, symbol, data_key = None, delay = 0):
+        """
+        Sends one request under the shared rate limiter and classifies the response (see
+        `response_classifier.classify_response`). Throttled responses lower the request rate, good ones
+        let it recover, and every outcome is counted in `request_stats`.
 
-    def _get_fundamental_data(self, **kwargs):
-        # Uses the input API key and fundamental data type.
-        # Loops through each stock symbol in the input list.
-        # Makes requests to the API, retrying up to 100 times if unsuccessful.
-        # Appends the response data to a results list if the request is successful.
-        # Prints error messages and skips to the next stock if unsuccessful after 100 attempts.
-        # Waits for 1 second between requests to avoid hitting API rate limits.
-        # Returns the list of fetched data.
+        Args:
+        - url (str): Full request URL including the API key.
+        - symbol (str): Stock symbol the request is made for, used in log messages.
+        - data_key (str, optional): Key a good response must contain (e.g. "Time Series (Daily)").
+        - delay (float, optional): Seconds to wait before the request, e.g. a backoff delay. Default is 0.
 
-        
-        symbols_list = kwargs.get("symbols_list")
-        fundamental_data = kwargs.get("fundamental_data")
-        
-        results = []
+        Returns:
+        - status (str): OK, EMPTY, THROTTLED, ERROR, or FAILED when no response could be decoded.
+        - json_data (dict or None): Decoded JSON with sentinel values dropped (see `helpers.loads_clean`),
+          or None when the status is not OK or EMPTY.
+        """
+        if delay:
+            time.sleep(delay)
+
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        size = 0
+        try:
+            response = self.http.get(url)
+            size = int(response.headers.get("Content-Length") or len(response.content))
+            json_data = loads_clean(response.content)
+            status = classify_response(json_data, data_key)
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            json_data = None
+            status = FAILED
+        METRICS.observe_request(self._endpoint(url), time.perf_counter() - start, status, size)
+
+        if status in (OK, EMPTY):
+            self.rate_controller.on_success()
+        elif status == THROTTLED:
+            self.rate_controller.on_throttle()
+        elif status == ERROR:
+            print(f"Error response for {symbol}: {str(json_data)[:200]}")
+
+        self._count(status)
+        if status not in (OK, EMPTY):
+            json_data = None
+        return status, json_data
+
+    @staticmethod
+    def _endpoint(url):
+        # Alpha Vantage function of a request URL, the endpoint name in the run metrics
+        match = re.search(r"function=([A-Z_]+)", url)
+        return match.group(1) if match else "unknown"
+
+    def _count(self, status, count = 1):
+        with self.request_stats_lock:
+            self.request_stats[status] += count
+        if status in ("retried", "requeued", "gave_up"):
+            METRICS.increment(f"alpha_vantage_{status}", count)
+
+    def _request_json(self, url, symbol, data_key = None):
+        """
+        Requests a single URL and returns the decoded JSON. Throttled and failed requests are retried up to
+        `max_attempts` times, throttled ones at the rate lowered by the adaptive rate controller and failed ones
+        with exponential backoff; error responses (e.g. an invalid symbol) are not retried.
+
+        Args:
+        - url (str): Full request URL including the API key.
+        - symbol (str): Stock symbol the request is made for, used in log messages.
+        - data_key (str, optional): Key the response must contain (e.g. "Time Series (Daily)").
+
+        Returns:
+        - json_data (dict or None): Decoded JSON response, or None if it is an error or every attempt failed.
+        """
+        delay = 0
+        for attempt in range(self.max_attempts):
+            status, json_data = self._fetch_once(url, symbol, data_key, delay)
+            if status in (OK, EMPTY):
+                return json_data
+            if status == ERROR:
+                return None
+            self._count("retried")
+            delay = 0 if status == THROTTLED else backoff_delay(attempt, self.backoff_base_delay, self.backoff_max_delay)
+
+        self._count("gave_up")
+        print(f"Failed to fetch data for {symbol} after {self.max_attempts} attempts. Skipping...")
+        return None
+
+    def request_summary(self):
+        """
+        Returns the request counters since the DataFetcher was created: responses per status (ok, empty,
+        throttled, error, failed), requests retried or requeued, symbols given up on, the share of throttled
+        responses and the current and configured request rates.
+        """
+        with self.request_stats_lock:
+            summary = {status: self.request_stats.get(status, 0)
+                       for status in (OK, EMPTY, THROTTLED, ERROR, FAILED, "retried", "requeued", "gave_up")}
+
+        responses = sum(summary[status] for status in (OK, EMPTY, THROTTLED, ERROR, FAILED))
+        summary["requests"] = responses
+        summary["throttled_share"] = summary[THROTTLED] / responses if responses else 0.0
+        summary["requests_per_minute"] = self.rate_limiter.requests_per_minute
+        summary["max_requests_per_minute"] = self.rate_controller.max_requests_per_minute
+        return summary
+
+    def export_request_stats(self, **kwargs):
+        """
+        Writes `request_summary` of this run to a JSON file and prints it.
+
+        Args:
+        - file_name (str): Name of the file in data_path. Default is request_stats_<timestamp>.json.
+
+        Returns:
+        - summary (dict): The exported counters.
+        """
+        file_name = kwargs.get("file_name", f"request_stats_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+        summary = self.request_summary()
+        with open(os.path.join(self.data_path, file_name), "w") as file:
+            json.dump(summary, file, indent = 2)
+
+        print(f"API requests: {summary['requests']} ({summary[OK]} ok, {summary[EMPTY]} empty, "
+              f"{summary[THROTTLED]} throttled, {summary[ERROR]} error, {summary[FAILED]} failed), "
+              f"rate {summary['requests_per_minute']:.1f}/{summary['max_requests_per_minute']} per minute.")
+        return summary
+
+    def _get_fundamentals_bundle(self, **kwargs):
+        """
+        Fetches several fundamental data types for lists of stocks in a single scheduler pass.
+        Every (symbol, function) pair is submitted to one thread pool sharing the token bucket, so slow
+        symbols overlap with fast ones and the symbol list is only walked once. Throttled and failed requests
+        are requeued behind the remaining ones (up to `max_attempts` times) while the adaptive rate controller
+        lowers the request rate; error responses are skipped.
+
+        Args:
+        - symbols_by_function (dict): Maps each Alpha Vantage function (e.g. "OVERVIEW", "INCOME_STATEMENT")
+          to the list of stock symbols to fetch it for.
+        - on_result (callable, optional): Called as on_result(symbol, function, json_data) in the calling thread
+          as soon as each response arrives, e.g. to write it to disk. Responses handed to on_result are not
+          kept in memory.
+
+        Returns:
+        - results (dict): Maps each function to a list of JSON objects in the order of its symbols list
+          (empty lists when on_result is given).
+        """
+        symbols_by_function = kwargs.get("symbols_by_function")
+        on_result = kwargs.get("on_result")
+
+        results = {function: [None] * len(symbols_list) for function, symbols_list in symbols_by_function.items()}
         start_time = time.time()
-        max_attempts = 100
 
-        for stock in tqdm(symbols_list, desc="Fetching data", unit="stock"):
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    url = f"{self.base_url}function={fundamental_data}&symbol={stock}&apikey={self.api_key}"
-                    response = requests.get(url)
-                    json_data = response.json()
-                    results.append(json_data)
-                    break  # Exit the loop if the request is successful
-                except Exception as e:
-                    print(f"Error fetching data for {stock}: {e}. Retrying...")
-                    attempts += 1
-                    time.sleep(2)  # Wait before retrying the request
-
-            if attempts == max_attempts:
-                print(f"Failed to fetch data for {stock} after {max_attempts} attempts. Skipping...")
-            
-            time.sleep(1)  # Wait xx seconds between requests to avoid hitting API rate limits
+        jobs = [(position, stock, function)
+                for function, symbols_list in symbols_by_function.items()
+                for position, stock in enumerate(symbols_list)]
+        # Schedule symbol by symbol so all data types of a company are fetched close together
+        jobs.sort(key = lambda job: job[0])
+
+        def submit(executor, job, attempt, delay = 0):
+            position, stock, function = job
+            url = f"{self.base_url}function={function}&symbol={stock}&apikey={self.api_key}"
+            return executor.submit(self._fetch_once, url, stock, None, delay), (job, attempt)
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as executor, \
+                tqdm(total = len(jobs), desc = "Fetching data", unit = "request") as progress:
+            pending = dict(submit(executor, job, 0) for job in jobs)
+
+            while pending:
+                done, _ = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    job, attempt = pending.pop(future)
+                    position, stock, function = job
+                    status, json_data = future.result()
+
+                    # Throttled and failed requests go back to the end of the queue and are sent again
+                    # at the lowered rate (failed ones after a backoff delay)
+                    if status in (THROTTLED, FAILED) and attempt + 1 < self.max_attempts:
+                        delay = 0 if status == THROTTLED else backoff_delay(attempt, self.backoff_base_delay,
+                                                                            self.backoff_max_delay)
+                        self._count("requeued")
+                        pending.update([submit(executor, job, attempt + 1, delay)])
+                        continue
+
+                    if status in (THROTTLED, FAILED):
+                        self._count("gave_up")
+                        print(f"Failed to fetch {function} for {stock} after {self.max_attempts} attempts. Skipping...")
+
+                    progress.update(1)
+                    if on_result is None:
+                        results[function][position] = json_data
+                    elif json_data is not None:
+                        on_result(stock, function, json_data)
+
+        results = {function: [json_data for json_data in data if json_data is not None] for function, data in results.items()}
 
         elapsed_time = time.time() - start_time
         print(f"Total time elapsed: {elapsed_time:.2f} seconds")
 
         return results
-    
-    
+
     def _get_fundamental_data(self, **kwargs):
         """
         Fetches fundamental data for a list of stocks from an API and returns the data in JSON format.
+        Requests are sent concurrently from a thread pool of `max_workers` threads, throttled by the
+        token bucket so that no more than `requests_per_minute` requests are made.
         :param kwargs: A dictionary of keyword arguments.
             - symbols_list: A list of stock symbols to fetch data for.
             - fundamental_data: The type of fundamental data to fetch (e.g. income statement, balance sheet).
-        :return: A list of JSON objects containing the fetched data for each stock.
+        :return: A list of JSON objects containing the fetched data for each stock, in the order of symbols_list.
         """
         symbols_list = kwargs.get("symbols_list")
         fundamental_data = kwargs.get("fundamental_data")
-        
-        results = []
-        start_time = time.time()
-        max_attempts = 100
-
-        for stock in tqdm(symbols_list, desc="Fetching data", unit="stock"):
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    url = f"{self.base_url}function={fundamental_data}&symbol={stock}&apikey={self.api_key}"
-                    response = requests.get(url)
-                    json_data = response.json()
-                    results.append(json_data)
-                    break  # Exit the loop if the request is successful
-                except Exception as e:
-                    print(f"Error fetching data for {stock}: {e}. Retrying...")
-                    attempts += 1
-                    time.sleep(2)  # Wait before retrying the request
-
-            if attempts == max_attempts:
-                print(f"Failed to fetch data for {stock} after {max_attempts} attempts. Skipping...")
-            
-            time.sleep(1)  # Wait xx seconds between requests to avoid hitting API rate limits
 
-        elapsed_time = time.time() - start_time
-        print(f"Total time elapsed: {elapsed_time:.2f} seconds")
+        results = self._get_fundamentals_bundle(symbols_by_function = {fundamental_data: symbols_list})
 
-        return results
+        return results[fundamental_data]
     
 
     def _get_stocks_listing(self, **kwargs):
@@ -132,29 +305,97 @@ class DataFetcher:
 
         base_url = f'{self.base_url}function={fundamental_data}&apikey={self.api_key}'
 
-        with requests.Session() as s:
-            download = s.get(base_url)
-            decoded_content = download.content.decode('utf-8')
-            df_temp = pd.read_csv(io.StringIO(decoded_content))
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        download = self.http.get(base_url)
+        METRICS.observe_request(fundamental_data, time.perf_counter() - start, OK,
+                                int(download.headers.get("Content-Length") or len(download.content)))
+        decoded_content = download.content.decode('utf-8')
+        df_temp = pd.read_csv(io.StringIO(decoded_content))
 
-            mask1 = df_temp['status'].str.lower() == status
-            mask2 = (df_temp['exchange'].str.lower() == exchange1) | (df_temp['exchange'].str.lower() == exchange2)
-            mask3 = df_temp['assetType'].str.lower() == assetType
-            mask4 = df_temp['symbol'].str.contains('-') == False
-            mask5 = df_temp['name'].str.contains('- Units') == False
-            mask6 = df_temp['name'].str.contains('Warrants') == False
-            mask7 = df_temp['name'].str.contains('TEST STOCK|LISTED TEST') == False
-            mask = mask1 & mask2 & mask3 & mask4 & mask5 & mask6 & mask7
-            df_temp = df_temp.loc[mask]
+        mask1 = df_temp['status'].str.lower() == status
+        mask2 = (df_temp['exchange'].str.lower() == exchange1) | (df_temp['exchange'].str.lower() == exchange2)
+        mask3 = df_temp['assetType'].str.lower() == assetType
+        mask4 = df_temp['symbol'].str.contains('-') == False
+        mask5 = df_temp['name'].str.contains('- Units') == False
+        mask6 = df_temp['name'].str.contains('Warrants') == False
+        mask7 = df_temp['name'].str.contains('TEST STOCK|LISTED TEST') == False
+        mask = mask1 & mask2 & mask3 & mask4 & mask5 & mask6 & mask7
+        df_temp = df_temp.loc[mask]
 
-            df_temp.drop_duplicates(subset = ['symbol'], inplace = True)
-            df_temp.drop_duplicates(subset = ['name'], keep = 'first', inplace = True)
+        df_temp.drop_duplicates(subset = ['symbol'], inplace = True)
+        df_temp.drop_duplicates(subset = ['name'], keep = 'first', inplace = True)
 
-            df_temp = df_temp[['symbol', 'name', 'exchange', 'ipoDate']].reset_index(drop = True)
+        df_temp = df_temp[['symbol', 'name', 'exchange', 'ipoDate']].reset_index(drop = True)
 
 
         return df_temp
     
+    def _price_frame(self, data):
+        """
+        Converts one Alpha Vantage time series ({date: {field: value}}) into a typed price frame with columns
+        stock_price_close (float32), trading_volume (int64) and trading_date (datetime64).
+        """
+        bars = list(data.values())
+
+        return pd.DataFrame({
+            "stock_price_close": np.array([bar[self.stock_price_close] for bar in bars], dtype = np.float32),
+            "trading_volume": np.array([bar[self.trading_volume] for bar in bars], dtype = np.float64).astype(np.int64),
+            "trading_date": pd.to_datetime(list(data.keys()), format = "%Y-%m-%d"),
+        })
+
+    def _concat_price_frames(self, frames, symbols, categories):
+        """
+        Concatenates per-symbol price frames once and adds the categorical company column
+        (categories in the order of symbols_list) from the frame lengths.
+        """
+        if frames:
+            results = pd.concat(frames, axis = 0, ignore_index = True)
+        else:
+            results = self._price_frame({})
+
+        codes = pd.Index(categories).get_indexer(symbols)
+        lengths = [len(frame) for frame in frames]
+        results["company"] = pd.Categorical.from_codes(np.repeat(codes, lengths), categories = categories)
+
+        return results
+
+    def _get_time_series(self, **kwargs):
+        """
+        Fetches the raw adjusted time series of a list of stock symbols from the TIME_SERIES_*_ADJUSTED endpoints,
+        over the shared HTTP transport and paced by the shared rate limiter.
+
+        Args:
+        - symbols_list (list of str): List of stock symbols to fetch data for.
+        - period (str): Time period to fetch data for. Must be either "daily", "weekly", or "monthly".
+        - outputsize (dict, optional): Maps symbols to "compact" (latest 100 bars) or "full" for daily data.
+          Symbols not in the dict use the default output size.
+
+        Returns:
+        - results (dict): Maps each fetched symbol to its time series ({date: {field: value}}).
+        """
+        symbols_list = kwargs.get("symbols_list")
+        period = kwargs.get("period")
+        outputsize = kwargs.get("outputsize") or {}
+
+        if period not in ["daily", "weekly", "monthly"]:
+            raise ValueError("period must be either daily, weekly, or monthly")
+
+        function, data_key = self.time_series_functions[period]
+
+        results = {}
+
+        for stock in tqdm(symbols_list, desc="Fetching data", unit="stock"):
+            url = f"{self.base_url}function={function}&symbol={stock}&apikey={self.api_key}"
+            if period == "daily":
+                url += f"&outputsize={outputsize.get(stock, self.outputsize)}"
+
+            json_data = self._request_json(url, stock, data_key = data_key)
+            if json_data is not None:
+                results[stock] = json_data[data_key]
+
+        return results
+
     def _get_stock_price_vol(self,**kwargs):
         """
         Fetches stock price and volume data for a list of stock symbols over a specified time period.
@@ -165,61 +406,160 @@ class DataFetcher:
 
         Returns:
         - results (pandas DataFrame): DataFrame containing stock price and volume data for each company in symbols_list.
+          Per-symbol frames are collected and concatenated once at the end.
         """
         symbols_list = kwargs.get("symbols_list")
         period = kwargs.get("period")
 
-        ts = TimeSeries(key = self.api_key)  
-        
-        results = pd.DataFrame()
         start_time = time.time()
-        max_attempts = 100
 
-        for stock in tqdm(symbols_list, desc="Fetching data", unit="stock"):
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    data = pd.DataFrame()
-                    
-                    if period == "daily":
-                        data, _ = ts.get_daily_adjusted(stock, outputsize = self.outputsize)
-                    elif period == "weekly":
-                        data, _ = ts.get_weekly_adjusted(stock)
-                    elif period == "monthly":
-                        data, _ = ts.get_monthly_adjusted(stock)
-                    else:
-                        raise ValueError("period must be either daily, weekly, or monthly")
-
-                    data = pd.DataFrame(data).T
-
-                    data.rename(columns = {self.stock_price_close: "stock_price_close",
-                                        self.trading_volume: "trading_volume"},
-                                        inplace = True)
-                    data = data.loc[:, ["stock_price_close", "trading_volume"]]
-
-                    data.loc[:, "trading_date"] = pd.to_datetime(data.index)
-                    data.loc[:, "company"] = stock
-                    data.reset_index(drop = True, inplace = True)
-                    results = pd.concat([results, data], axis = 0)
-                    break  # Exit the loop if the request is successful
-
-                except Exception as e:
-                    print(f"Error fetching data for {stock}: {e}. Retrying...")
-                    attempts += 1
-                    time.sleep(2)  # Wait before retrying the request
-        
+        data = self._get_time_series(symbols_list = symbols_list, period = period)
 
-            if attempts == max_attempts:
-                print(f"Failed to fetch data for {stock} after {max_attempts} attempts. Skipping...")
-            
-            time.sleep(1)  # Wait xx seconds between requests to avoid hitting API rate limits
+        categories = pd.unique(pd.Series(symbols_list))
+        fetched_symbols = [stock for stock in symbols_list if stock in data]
+        frames = [self._price_frame(data[stock]) for stock in fetched_symbols]
+        results = self._concat_price_frames(frames, fetched_symbols, categories)
 
         elapsed_time = time.time() - start_time
         print(f"Total time elapsed: {elapsed_time:.2f} seconds")
 
         return results
+
+    def _is_up_to_date(self, last_date, period, today):
+        # The last stored bar is at best the last completed session, so it is compared against the previous
+        # business day, or for weekly / monthly bars against the last week / month completed by then.
+        # A partial bar of the current week or month is dated after that boundary, so it counts as up to date
+        # until its period is over.
+        last_session = today - pd.offsets.BDay(1)
+        if period == "daily":
+            last_complete = last_session
+        elif period == "weekly":
+            last_complete = pd.offsets.Week(weekday = 4).rollback(last_session)
+        else:
+            last_complete = pd.offsets.BMonthEnd().rollback(last_session)
+        return last_date >= last_complete
+
+    def _has_corporate_action(self, bars):
+        # A dividend or split in the new bars changes the adjusted close of the whole history
+        for bar in bars.values():
+            if float(bar.get(self.dividend_amount, 0) or 0) != 0:
+                return True
+            if float(bar.get(self.split_coefficient, 1) or 1) != 1:
+                return True
+        return False
+
+    def stale_price_symbols(self, **kwargs):
+        """
+        Returns the symbols whose stored price bars are missing or older than the last completed bar,
+        i.e. the symbols `update_stock_price_vol` would request.
+
+        Args:
+        - symbols_list (list of str): List of stock symbols.
+        - period (str): "daily", "weekly" or "monthly".
+
+        Returns:
+        - stale_symbols (list of str): Symbols to fetch, in the order of symbols_list.
+        """
+        symbols_list = kwargs.get("symbols_list")
+        period = kwargs.get("period")
+
+        today = pd.Timestamp.today().normalize()
+        last_dates = self.price_store.last_trading_dates(period) if self.price_store.has_period(period) else {}
+
+        return [stock for stock in symbols_list
+                if last_dates.get(stock) is None or not self._is_up_to_date(last_dates[stock], period, today)]
+
+    @METRICS.timed("fetch.update_stock_price_vol")
+    def update_stock_price_vol(self, **kwargs):
+        """
+        Incrementally updates the price store with the bars published since the last stored trading date.
+
+        Symbols missing from the store are fetched in full. For daily data, symbols whose last stored bar is at
+        most `compact_max_gap_days` old are requested with the compact output size (latest 100 bars) and only the
+        bars from the last stored date onwards are merged in. When a dividend or split shows up in the new bars,
+        the adjusted history of that symbol is refetched in full and replaces the stored one. Weekly and monthly
+        series are always returned in full by the API, so they replace the stored series: the bar of a partial
+        week or month is dated differently from its final bar, and merging would keep both.
+
+        Args:
+        - symbols_list (list of str): List of stock symbols to update.
+        - period (str): "daily", "weekly" or "monthly".
+
+        Returns:
+        - summary (dict): Number of symbols skipped (up to date), merged, replaced and fetched in full.
+        """
+        symbols_list = kwargs.get("symbols_list")
+        period = kwargs.get("period")
+
+        start_time = time.time()
+        today = pd.Timestamp.today().normalize()
+        last_dates = self.price_store.last_trading_dates(period)
+
+        outputsize = {}
+        for stock in symbols_list:
+            last_date = last_dates.get(stock)
+            if last_date is not None and self._is_up_to_date(last_date, period, today):
+                continue
+            if period == "daily" and last_date is not None and (today - last_date).days <= self.compact_max_gap_days:
+                outputsize[stock] = "compact"
+            else:
+                outputsize[stock] = "full"
+
+        data = self._get_time_series(symbols_list = list(outputsize), period = period, outputsize = outputsize)
+
+        merged = {}
+        replaced = {}
+        refetch = []
+        for stock, bars in data.items():
+            last_date = last_dates.get(stock)
+            if last_date is None or period != "daily":
+                replaced[stock] = bars
+                continue
+
+            new_bars = {trading_date: bar for trading_date, bar in bars.items() if pd.Timestamp(trading_date) > last_date}
+            if self._has_corporate_action(new_bars):
+                if outputsize[stock] == "compact":
+                    refetch.append(stock)
+                else:
+                    replaced[stock] = bars
+            else:
+                merged[stock] = {trading_date: bar for trading_date, bar in bars.items() if pd.Timestamp(trading_date) >= last_date}
+
+        if refetch:
+            print(f"Dividends or splits found for {len(refetch)} symbols. Refetching full adjusted history...")
+            replaced.update(self._get_time_series(symbols_list = refetch, period = period,
+                                                  outputsize = {stock: "full" for stock in refetch}))
+
+        frames = []
+        if merged:
+            merged_symbols = list(merged)
+            df_new = self._concat_price_frames([self._price_frame(merged[stock]) for stock in merged_symbols],
+                                               merged_symbols, merged_symbols)
+            df_stored = self.price_store.load(period = period, symbols_list = merged_symbols)
+            frames.append(pd.concat([df_stored.astype({"company": str}), df_new.astype({"company": str})], ignore_index = True)
+                          .drop_duplicates(subset = ["company", "trading_date"], keep = "last"))
+        if replaced:
+            replaced_symbols = list(replaced)
+            frames.append(self._concat_price_frames([self._price_frame(replaced[stock]) for stock in replaced_symbols],
+                                                    replaced_symbols, replaced_symbols))
+
+        for df_update in frames:
+            self.price_store.write(df_update, period)
+
+        summary = {
+            "skipped": len(symbols_list) - len(outputsize),
+            "merged": len(merged),
+            "replaced": len([stock for stock in replaced if stock in last_dates]),
+            "new": len([stock for stock in replaced if stock not in last_dates]),
+        }
+
+        elapsed_time = time.time() - start_time
+        print(f"Price update: {summary}. Total time elapsed: {elapsed_time:.2f} seconds")
+
+        return summary
     
 
+    @METRICS.timed("fetch.stocks_listing")
     def fetch_stocks_listing(self, **kwargs):
         """
         Fetches a list of all currently listed stocks.
@@ -252,9 +592,30 @@ class DataFetcher:
         return symbols_list, df_listed_stocks
     
 
+    def _migrate_fundamental_pickle(self, fundamental_data):
+        """
+        Imports a legacy `{fundamental_data}_data.pkl` cache into the per-symbol store the first time
+        the function is requested, so existing downloads are not fetched again.
+        """
+        pickle_file_path = os.path.join(self.data_path, f"{fundamental_data}_data.pkl")
+
+        if not os.path.exists(pickle_file_path) or self.fundamental_store.count(fundamental_data) > 0:
+            return
+
+        print(f"Pickle file for {fundamental_data} found. Migrating data to the fundamental data store...")
+        with open(pickle_file_path, 'rb') as f:
+            data = pickle.load(f)
+
+        for json_data in data:
+            symbol = json_data.get("Symbol", json_data.get("symbol")) if json_data else None
+            if symbol:
+                self.fundamental_store.put(symbol, fundamental_data, json_data)
+        print(f"{fundamental_data} data migrated from pickle file.")
+
+    @METRICS.timed("fetch.fundamental_data")
     def fetch_fundamental_data(self, **kwargs):
         """
-        Fetches fundamental data for a list of symbols and saves/loads it to/from a pickle file.
+        Fetches fundamental data for a list of symbols and saves/loads it to/from the fundamental data store.
 
         Args:
             symbols_list (list): A list of stock symbols.
@@ -266,63 +627,106 @@ class DataFetcher:
         symbols_list = kwargs.get("symbols_list")
         fundamental_data = kwargs.get("fundamental_data")
 
-        pickle_file_path = os.path.join(self.data_path, f"{fundamental_data}_data.pkl")
+        data = self.fetch_fundamentals_bundle(symbols_list = symbols_list, functions = [fundamental_data])
 
-        if not os.path.exists(pickle_file_path):
-            print(f"Pickle file for {fundamental_data} not found. Fetching data...")
-            # Get fundamental data
-            data = self._get_fundamental_data(api_key = self.api_key, symbols_list=symbols_list, fundamental_data=fundamental_data)
-            
-            print(f"Saving {fundamental_data} data to pickle file...")
-            # Save the list to a file
-            with open(pickle_file_path, 'wb') as f:
-                pickle.dump(data, f)
-            print(f"{fundamental_data} data saved to pickle file.")
-        else:
-            print(f"Pickle file for {fundamental_data} found. Loading data...")
-            # Load the list from the file
-            with open(pickle_file_path, 'rb') as f:
-                data = pickle.load(f)
-            print(f"{fundamental_data} data loaded from pickle file.")
-        
-        return data
+        return data[fundamental_data]
+
+    @METRICS.timed("fetch.fundamentals_bundle")
+    def fetch_fundamentals_bundle(self, **kwargs):
+        """
+        Fetches several fundamental data types for a list of symbols in one pass and saves/loads them
+        to/from the per-symbol fundamental data store. Only symbols that are missing from the store or
+        stale are requested, and each response is committed to the store as soon as it arrives, so an
+        interrupted run can be resumed where it stopped.
+
+        Args:
+            symbols_list (list): A list of stock symbols.
+            functions (list): Fundamental data types to fetch. Default is OVERVIEW, INCOME_STATEMENT,
+                BALANCE_SHEET and CASH_FLOW.
+            load (bool): Load the stored data and return it. Default is True. Pass False to only bring the
+                store up to date, e.g. before reading it in batches with `FundamentalStore.iter_many`.
+
+        Returns:
+            data (dict): Maps each fundamental data type to a list of dictionaries with the data for each symbol,
+                or None when load is False.
+        """
+        symbols_list = kwargs.get("symbols_list")
+        functions = kwargs.get("functions", self.fundamental_functions)
+        load = kwargs.get("load", True)
+
+        symbols_by_function = {}
+
+        for function in functions:
+            self._migrate_fundamental_pickle(function)
+            stale_symbols = self.fundamental_store.stale_symbols(function, symbols_list)
+            print(f"{function}: {len(symbols_list) - len(stale_symbols)} symbols cached, {len(stale_symbols)} to fetch.")
+            if stale_symbols:
+                symbols_by_function[function] = stale_symbols
+
+        if symbols_by_function:
+            self._get_fundamentals_bundle(symbols_by_function = symbols_by_function,
+                                          on_result = self.fundamental_store.put)
+
+        if not load:
+            return None
+
+        return {function: self.fundamental_store.get_many(function, symbols_list) for function in functions}
     
+    @METRICS.timed("fetch.company_data_by_key")
     def fetch_company_data_by_key(self, **kwargs):
         """
-        Fetches fundamental data for a list of symbols and saves/loads it to/from a pickle file.
+        Fetches the records of a single company from processed fundamental data.
 
         Args:
-            symbols_list (list): A list of stock symbols.
-            fundamental_data (str): The type of fundamental data to fetch.
+            stock_data (list or dict): Either a list of dictionaries as returned by the `DataProcessor`
+                methods (scanned linearly), or a symbol index built with `DataProcessor.index_by_symbol`
+                (looked up in O(1)).
+            key (str): Record key holding the company symbol, used when stock_data is a list. Default is "symbol".
+            company_symbol (str): Symbol of the company to fetch.
         
         Returns:
-            data (list): A list of dictionaries containing the fundamental data for each symbol.
+            output_list (list): A list of dictionaries containing the records of the company.
         """
         stock_data = kwargs.get("stock_data")
         key = kwargs.get("key", "symbol")
         company_symbol = kwargs.get("company_symbol")
 
-        output_list = [company for company in stock_data if company[key] == company_symbol]
+        if isinstance(stock_data, dict):
+            output_list = stock_data.get(company_symbol, [])
+        else:
+            output_list = [company for company in stock_data if company[key] == company_symbol]
 
         if not output_list:
             print(f"No data found for {company_symbol}")
 
         return output_list
 
+    @METRICS.timed("fetch.latest_stock_price_vol")
     def fetch_latest_stock_price_vol(self, **kwargs):
         """
-        Fetches fundamental data for a list of symbols and saves/loads it to/from a pickle file.
+        Fetches the latest stock price and volume of a list of symbols, using the Parquet price store as cache.
+        A legacy `latest_downloaded_stocks.csv` cache is migrated into the store the first time it is found.
 
         Args:
             symbols_list (list): A list of stock symbols.
-            fundamental_data (str): The type of fundamental data to fetch.
+            period (str): "daily", "weekly" or "monthly". Default is "monthly".
+            min_stock_price (float): Lower bound (exclusive) on the stock price. Default is 0.
+            max_stock_price (float): Upper bound (exclusive) on the stock price. Default is 10.
+            min_volume (float): Lower bound (exclusive) on the trading volume. Default is 0.
+            min_dollar_volume (float): Lower bound on price times volume. Default is 0.
+            refresh (bool): Fetch the bars published since the last stored date (see `update_stock_price_vol`)
+                before loading. Default is False.
         
         Returns:
-            data (list): A list of dictionaries containing the fundamental data for each symbol.
+            df_stocks (pandas DataFrame): The latest bar of every symbol, kept if it passes the filters.
         """
         symbols_list = kwargs.get("symbols_list")
         period = kwargs.get("period", "monthly")
+        min_stock_price = kwargs.get("min_stock_price", 0)
         max_stock_price = kwargs.get("max_stock_price", 10)
+        min_volume = kwargs.get("min_volume", 0)
+        min_dollar_volume = kwargs.get("min_dollar_volume", 0)
+        refresh = kwargs.get("refresh", False)
         file_path_latest_downloaded_stocks = os.path.join(self.data_path, self.latest_downloaded_stocks)
 
 
@@ -330,22 +734,27 @@ class DataFetcher:
             raise ValueError("period must be either 'daily', 'weekly', or 'monthly'")
 
 
-        if not os.path.exists(file_path_latest_downloaded_stocks):
-            print("CSV file for file path latest downloaded stocks not found. Fetching data...")
-            df_stocks = self._get_stock_price_vol(symbols_list = symbols_list, period = period)
-            save_dataframe_to_csv(df_stocks, file_path_latest_downloaded_stocks)
-            print("Latest downloaded stocks data saved to CSV file.")
-        else:
-            print("CSV file for Latest downloaded stocks found. Loading data...")
-            df_stocks = pd.read_csv(file_path_latest_downloaded_stocks)
-            print("Latest downloaded stocks data loaded from CSV file.")
-
-
-        df_stocks['stock_price_close'] = df_stocks['stock_price_close'].astype(float)
-        df_stocks['trading_volume'] = df_stocks['trading_volume'].astype(float)
-
-        mask = (df_stocks["stock_price_close"] > 0) & (df_stocks["stock_price_close"] < max_stock_price) & (df_stocks["trading_volume"] > 0) 
-        df_stocks = df_stocks.loc[mask].groupby("company").apply(lambda x: x[x["trading_date"] == x["trading_date"].max()]).reset_index(drop = True)
+        if not self.price_store.has_period(period):
+            if os.path.exists(file_path_latest_downloaded_stocks):
+                print("CSV file for Latest downloaded stocks found. Migrating data to the price store...")
+                self.price_store.migrate_csv(file_path_latest_downloaded_stocks, period)
+            else:
+                print(f"Price store for {period} data not found. Fetching data...")
+                df_stocks = self._get_stock_price_vol(symbols_list = symbols_list, period = period)
+                self.price_store.write(df_stocks, period)
+                print(f"{period} price data saved to the price store.")
+        elif refresh:
+            print(f"Updating {period} price data in the price store...")
+            self.update_stock_price_vol(symbols_list = symbols_list, period = period)
+
+        print(f"Loading latest {period} bars from the price store...")
+        df_stocks = self.price_store.load_latest(period = period, symbols_list = symbols_list)
+        print(f"Latest {period} bars loaded from the price store.")
+
+        dollar_volume = df_stocks["stock_price_close"].astype(float) * df_stocks["trading_volume"]
+        mask = ((df_stocks["stock_price_close"] > min_stock_price) & (df_stocks["stock_price_close"] < max_stock_price)
+                & (df_stocks["trading_volume"] > min_volume) & (dollar_volume >= min_dollar_volume))
+        df_stocks = df_stocks.loc[mask].reset_index(drop = True)
 
         if len(df_stocks["company"].unique()) != len(symbols_list):
             missing_symbols = list(set(symbols_list) - set(df_stocks["company"].unique()))
@@ -353,3 +762,22 @@ class DataFetcher:
 
         return df_stocks
 
+    @METRICS.timed("fetch.build_price_matrix")
+    def build_price_matrix(self, **kwargs):
+        """
+        Builds the memory-mapped date x symbol price and volume matrices of a period from the price store.
+
+        Args:
+            period (str): "daily", "weekly" or "monthly". Default is "daily".
+            symbols_list (list): Symbols to include. Default is every stored symbol.
+
+        Returns:
+            price_matrix (PriceMatrix): The built matrix, saved under `{data_path}/price_matrix_{period}`.
+        """
+        period = kwargs.get("period", "daily")
+        symbols_list = kwargs.get("symbols_list")
+
+        return PriceMatrix.build(price_store = self.price_store,
+                                 period = period,
+                                 matrix_dir = os.path.join(self.data_path, f"price_matrix_{period}"),
+                                 symbols_list = symbols_list)
@@ -1,5 +1,45 @@
+import numpy as np
 import pandas as pd
-from helpers import to_float, safe_divide, remove_unwanted_values
+from metrics import METRICS
+from helpers import (
+    to_float,
+    safe_divide,
+    drop_unwanted_values,
+    index_by_key,
+    to_float_column,
+    safe_divide_columns,
+    UNWANTED_VALUES,
+)
+
+
+# Output column -> Alpha Vantage OVERVIEW field, for fields passed through as they are
+OVERVIEW_TEXT_FIELDS = {
+    'Symbol': 'Symbol',
+    'Name': 'Name',
+    'Sector': 'Sector',
+    'Industry': 'Industry',
+    'LatestQuarter': 'LatestQuarter',
+}
+OVERVIEW_NUMERIC_FIELDS = {
+    'MarketCapitalization': 'MarketCapitalization',
+    'PERatio': 'PERatio',
+    'ForwardPERatio': 'ForwardPE',
+    'PEGRatio': 'PEGRatio',
+    'PriceToSalesRatio': 'PriceToSalesRatioTTM',
+    'PriceToBookRatio': 'PriceToBookRatio',
+    'EPS': 'EPS',
+    'NetProfitMargin': 'ProfitMargin',
+    'DividendPerShare': 'DividendPerShare',
+    'DividendYield': 'DividendYield',
+    'ReturnOnAssets': 'ReturnOnAssetsTTM',
+    'ReturnOnEquity': 'ReturnOnEquityTTM',
+    'Revenue': 'RevenueTTM',
+    'RevenuePerShare': 'RevenuePerShareTTM',
+}
+OVERVIEW_COLUMNS = ['Symbol', 'Name', 'Sector', 'Industry', 'LatestQuarter', 'MarketCapitalization', 'PERatio',
+                    'ForwardPERatio', 'PEGRatio', 'PriceToSalesRatio', 'PriceToBookRatio', 'EPS', 'GrossProfitMargin',
+                    'NetProfitMargin', 'DividendPerShare', 'DividendYield', 'ReturnOnAssets', 'ReturnOnEquity',
+                    'Revenue', 'RevenuePerShare']
 
 class DataProcessor:
     # This module contains a class called `DataProcessor` which is used to process fundamental data for a list of stocks.
@@ -15,6 +55,7 @@ class DataProcessor:
     def __init__(self):
         pass
 
+    @METRICS.timed("process.overview")
     def process_fundamental_data_overview(self, **kwargs):
         # Process fundamental data for a list of stocks.
         # Extract relevant information from the input stock data.
@@ -24,9 +65,8 @@ class DataProcessor:
 
         stock_data = kwargs.get("stock_data")
         
-        data = stock_data.copy()
         # Remove empty values
-        filtered_data = [company_data for company_data in data if company_data]
+        filtered_data = [company_data for company_data in stock_data if company_data]
 
         relevant_info_list = []
         
@@ -34,7 +74,7 @@ class DataProcessor:
         for company_data in filtered_data:
 
             gross_profit = to_float(company_data.get('GrossProfitTTM', 0))
-            revenue = to_float(company_data.get('RevenueTTM', 1))
+            revenue = to_float(company_data.get('RevenueTTM', 0))
             gross_profit_margin = safe_divide(gross_profit, revenue)
 
             relevant_info = {
@@ -61,12 +101,13 @@ class DataProcessor:
             }
             relevant_info_list.append(relevant_info)
             
-        relevant_info_list = remove_unwanted_values(relevant_info_list)
+        relevant_info_list = [drop_unwanted_values(relevant_info) for relevant_info in relevant_info_list]
         relevant_info_list = [company for company in relevant_info_list if "Symbol" in company.keys()]
 
 
         return relevant_info_list
 
+    @METRICS.timed("process.income")
     def process_fundamental_data_income(self, **kwargs):
         # Process fundamental data for a list of stocks.
         # Extract relevant information from the input stock data.
@@ -77,9 +118,8 @@ class DataProcessor:
         stock_data = kwargs.get("stock_data")
         threshold_date = kwargs.get("threshold_date", '2021-01-01') 
         
-        data = stock_data.copy()
         # Remove empty values
-        filtered_data = [company_data for company_data in data if company_data]
+        filtered_data = [company_data for company_data in stock_data if company_data]
 
         relevant_info_list = []
 
@@ -113,13 +153,14 @@ class DataProcessor:
                     relevant_info_list.append(relevant_info)
 
 
-        relevant_info_list = remove_unwanted_values(relevant_info_list)
+        relevant_info_list = [drop_unwanted_values(relevant_info) for relevant_info in relevant_info_list]
         relevant_info_list = [company for company in relevant_info_list if (pd.to_datetime(company['FiscalDateEnding']) >= pd.to_datetime(threshold_date)) & ("Symbol" in company.keys())]
 
         return relevant_info_list
 
 
 
+    @METRICS.timed("process.balance_sheet")
     def process_fundamental_data_balance_sheet(self, **kwargs):
         # Process fundamental data for a list of stocks.
         # Extract relevant information from the input stock data.
@@ -130,9 +171,8 @@ class DataProcessor:
         stock_data = kwargs.get("stock_data")
         threshold_date = kwargs.get("threshold_date", '2021-01-01')
         
-        data = stock_data.copy()
         # Remove empty values
-        filtered_data = [company_data for company_data in data if company_data]
+        filtered_data = [company_data for company_data in stock_data if company_data]
 
         relevant_info_list = []
 
@@ -147,7 +187,7 @@ class DataProcessor:
                     total_current_assets = to_float(report.get('totalCurrentAssets', 0))
                     total_current_liabilities = to_float(report.get('totalCurrentLiabilities', 0))
                     retained_earnings = to_float(report.get('retainedEarnings', 0))
-                    common_stock_shares_outstanding = report.get('commonStockSharesOutstanding', 0)
+                    common_stock_shares_outstanding = report.get('commonStockSharesOutstanding', None)
                     fiscal_date_ending = report.get('fiscalDateEnding', None)
 
                     debt_to_equity_ratio = safe_divide(total_liabilities, total_shareholder_equity)
@@ -164,12 +204,13 @@ class DataProcessor:
                     }
                     relevant_info_list.append(relevant_info)
 
-        relevant_info_list = remove_unwanted_values(relevant_info_list)
+        relevant_info_list = [drop_unwanted_values(relevant_info) for relevant_info in relevant_info_list]
         relevant_info_list = [company for company in relevant_info_list if (pd.to_datetime(company['FiscalDateEnding']) >= pd.to_datetime(threshold_date)) & ("Symbol" in company.keys())]
 
         return relevant_info_list
 
 
+    @METRICS.timed("process.cash_flow")
     def process_fundamental_data_cash_flow(self, **kwargs):
         # Process fundamental data for a list of stocks.
         # Extract relevant information from the input stock data.
@@ -179,9 +220,8 @@ class DataProcessor:
         stock_data = kwargs.get("stock_data")
         threshold_date = kwargs.get("threshold_date", '2021-01-01')
         
-        data = stock_data.copy()
         # Remove empty values
-        filtered_data = [company_data for company_data in data if company_data]
+        filtered_data = [company_data for company_data in stock_data if company_data]
         
 
         relevant_info_list = []
@@ -206,7 +246,254 @@ class DataProcessor:
                     }
                     relevant_info_list.append(relevant_info)
 
-        relevant_info_list = remove_unwanted_values(relevant_info_list)
+        relevant_info_list = [drop_unwanted_values(relevant_info) for relevant_info in relevant_info_list]
         relevant_info_list = [company for company in relevant_info_list if (pd.to_datetime(company['FiscalDateEnding']) >= pd.to_datetime(threshold_date)) & ("Symbol" in company.keys())]
 
-        return relevant_info_list
\ No newline at end of file
+        return relevant_info_list
+
+
+    def index_by_symbol(self, **kwargs):
+        # Build a symbol-indexed view of the output of any `process_fundamental_data_*` method.
+        # Maps each symbol to the list of its records (in the original order), so that
+        # `DataFetcher.fetch_company_data_by_key` can look a company up in O(1) instead of scanning the list.
+
+        stock_data = kwargs.get("stock_data")
+        key = kwargs.get("key", "Symbol")
+
+        return index_by_key(stock_data, key)
+
+
+    # Columnar mode.
+    # The `*_frame` methods below produce the same information as the `process_fundamental_data_*` methods,
+    # but normalize the raw Alpha Vantage JSON into a single DataFrame per statement type and compute all
+    # margins and ratios with vectorized, zero-safe division. Numeric fields are typed as float64 and missing
+    # values are NaN. Use `frame_to_records` to get the list-of-dicts shape of the original methods back.
+
+    def _reports_frame(self, stock_data, fields, reports_key = 'annualReports'):
+        # Flatten the reports of every company into one DataFrame with a `Symbol` column and the requested fields.
+        records = [dict(report, Symbol = company.get('symbol'))
+                   for company in stock_data if company
+                   for report in company.get(reports_key) or []]
+
+        frame = pd.DataFrame.from_records(records)
+        frame = frame.reindex(columns = ['Symbol', 'fiscalDateEnding'] + fields)
+        frame = frame.rename(columns = {'fiscalDateEnding': 'FiscalDateEnding'})
+        frame[['Symbol', 'FiscalDateEnding']] = frame[['Symbol', 'FiscalDateEnding']].replace(list(UNWANTED_VALUES[1:]), np.nan)
+
+        return frame
+
+    def _filter_threshold_date(self, frame, threshold_date):
+        # Keep rows with a symbol and a fiscal date on or after threshold_date, using one datetime comparison.
+        fiscal_dates = pd.to_datetime(frame['FiscalDateEnding'], errors = 'coerce')
+        mask = frame['Symbol'].notna() & (fiscal_dates >= pd.to_datetime(threshold_date))
+
+        return frame.loc[mask].reset_index(drop = True)
+
+    @METRICS.timed("process.overview_frame")
+    def process_fundamental_data_overview_frame(self, **kwargs):
+        # Columnar version of `process_fundamental_data_overview`.
+        # Return a DataFrame with one row per company.
+
+        stock_data = kwargs.get("stock_data")
+
+        raw = pd.DataFrame.from_records([company_data for company_data in stock_data if company_data])
+        raw = raw.reindex(columns = sorted(set(OVERVIEW_TEXT_FIELDS.values()) | set(OVERVIEW_NUMERIC_FIELDS.values()) | {'GrossProfitTTM'}))
+
+        gross_profit = to_float_column(raw['GrossProfitTTM'])
+        revenue = to_float_column(raw['RevenueTTM'])
+
+        frame = pd.DataFrame({column: raw[field].replace(list(UNWANTED_VALUES[1:]), np.nan)
+                              for column, field in OVERVIEW_TEXT_FIELDS.items()})
+        for column, field in OVERVIEW_NUMERIC_FIELDS.items():
+            frame[column] = pd.to_numeric(raw[field], errors = 'coerce')
+        frame['GrossProfitMargin'] = safe_divide_columns(gross_profit, revenue)
+
+        frame = frame.loc[frame['Symbol'].notna(), OVERVIEW_COLUMNS].reset_index(drop = True)
+
+        return frame
+
+    @METRICS.timed("process.income_frame")
+    def process_fundamental_data_income_frame(self, **kwargs):
+        # Columnar version of `process_fundamental_data_income`.
+        # Return a DataFrame with one row per annual report on or after threshold_date.
+
+        stock_data = kwargs.get("stock_data")
+        threshold_date = kwargs.get("threshold_date", '2021-01-01')
+
+        raw = self._reports_frame(stock_data, ['grossProfit', 'totalRevenue', 'operatingIncome', 'netIncome'])
+        raw = self._filter_threshold_date(raw, threshold_date)
+
+        gross_profit = to_float_column(raw['grossProfit'])
+        total_revenue = to_float_column(raw['totalRevenue'])
+        operating_income = to_float_column(raw['operatingIncome'])
+        net_income = to_float_column(raw['netIncome'])
+
+        frame = pd.DataFrame({
+            'Symbol': raw['Symbol'],
+            'FiscalDateEnding': raw['FiscalDateEnding'],
+            'GrossProfit': gross_profit,
+            'OperatingIncome': operating_income,
+            'GrossProfitMargin': safe_divide_columns(gross_profit, total_revenue),
+            'OperatingMargin': safe_divide_columns(operating_income, total_revenue),
+            'NetProfitMargin': safe_divide_columns(net_income, total_revenue),
+        })
+
+        return frame
+
+    @METRICS.timed("process.balance_sheet_frame")
+    def process_fundamental_data_balance_sheet_frame(self, **kwargs):
+        # Columnar version of `process_fundamental_data_balance_sheet`.
+        # Return a DataFrame with one row per annual report on or after threshold_date.
+
+        stock_data = kwargs.get("stock_data")
+        threshold_date = kwargs.get("threshold_date", '2021-01-01')
+
+        raw = self._reports_frame(stock_data, ['totalLiabilities', 'totalShareholderEquity', 'totalCurrentAssets',
+                                               'totalCurrentLiabilities', 'retainedEarnings', 'commonStockSharesOutstanding'])
+        raw = self._filter_threshold_date(raw, threshold_date)
+
+        total_liabilities = to_float_column(raw['totalLiabilities'])
+        total_shareholder_equity = to_float_column(raw['totalShareholderEquity'])
+        total_current_assets = to_float_column(raw['totalCurrentAssets'])
+        total_current_liabilities = to_float_column(raw['totalCurrentLiabilities'])
+        retained_earnings = to_float_column(raw['retainedEarnings'])
+
+        frame = pd.DataFrame({
+            'Symbol': raw['Symbol'],
+            'FiscalDateEnding': raw['FiscalDateEnding'],
+            'DebtToEquityRatio': safe_divide_columns(total_liabilities, total_shareholder_equity),
+            'CurrentRatio': safe_divide_columns(total_current_assets, total_current_liabilities),
+            'ReturnOnEquity': safe_divide_columns(retained_earnings, total_shareholder_equity),
+            'commonStockSharesOutstanding': pd.to_numeric(raw['commonStockSharesOutstanding'], errors = 'coerce'),
+        })
+
+        return frame
+
+    @METRICS.timed("process.cash_flow_frame")
+    def process_fundamental_data_cash_flow_frame(self, **kwargs):
+        # Columnar version of `process_fundamental_data_cash_flow`.
+        # Return a DataFrame with one row per annual report on or after threshold_date.
+
+        stock_data = kwargs.get("stock_data")
+        threshold_date = kwargs.get("threshold_date", '2021-01-01')
+
+        raw = self._reports_frame(stock_data, ['operatingCashflow', 'capitalExpenditures', 'dividendPayout'])
+        raw = self._filter_threshold_date(raw, threshold_date)
+
+        frame = pd.DataFrame({
+            'Symbol': raw['Symbol'],
+            'FiscalDateEnding': raw['FiscalDateEnding'],
+            'OperatingCashflow': pd.to_numeric(raw['operatingCashflow'], errors = 'coerce'),
+            'CapitalExpenditures': pd.to_numeric(raw['capitalExpenditures'], errors = 'coerce'),
+            'DividendPayout': pd.to_numeric(raw['dividendPayout'], errors = 'coerce'),
+        })
+
+        return frame
+
+    # Trend features.
+    # `process_trend_features_frame` summarizes all reports of every company (not only those after a threshold
+    # date) into one row of multi-year features, computed with grouped vectorized operations.
+
+    def _statement_history(self, income_data, balance_data, cash_flow_data, reports_key = 'annualReports'):
+        # Join the income, balance sheet and cash flow reports of every company into one typed frame per fiscal date.
+        keys = ['Symbol', 'FiscalDateEnding']
+        frames = [self._reports_frame(income_data, ['totalRevenue', 'grossProfit', 'operatingIncome', 'netIncome'], reports_key),
+                  self._reports_frame(balance_data, ['totalShareholderEquity'], reports_key),
+                  self._reports_frame(cash_flow_data, ['operatingCashflow', 'capitalExpenditures'], reports_key)]
+
+        history = frames[0]
+        for frame in frames[1:]:
+            history = history.merge(frame, on = keys, how = 'outer')
+
+        history = history.loc[history['Symbol'].notna()].copy()
+        history['FiscalDateEnding'] = pd.to_datetime(history['FiscalDateEnding'], errors = 'coerce')
+        history = history.loc[history['FiscalDateEnding'].notna()]
+        for column in history.columns.difference(keys):
+            history[column] = pd.to_numeric(history[column], errors = 'coerce')
+
+        return history.sort_values(keys).reset_index(drop = True)
+
+    def _cagr(self, history, column):
+        # Compound annual growth between the first and last reported value, when both are positive.
+        values = history.loc[history[column].notna(), ['Symbol', 'FiscalDateEnding', column]]
+        grouped = values.groupby('Symbol')
+        first, last = grouped[column].first(), grouped[column].last()
+        years = (grouped['FiscalDateEnding'].last() - grouped['FiscalDateEnding'].first()).dt.days / 365.25
+
+        valid = (first > 0) & (last > 0) & (years >= 1)
+        return ((last / first) ** (1 / years.where(valid)) - 1).where(valid)
+
+    def _slope(self, history, column):
+        # Least squares slope per year of `column` against the fiscal date, for every company.
+        values = history.loc[history[column].notna(), ['Symbol', 'FiscalDateEnding', column]]
+        x = (values['FiscalDateEnding'] - pd.Timestamp('2000-01-01')).dt.days / 365.25
+        y = values[column]
+        grouped_x, grouped_y = x.groupby(values['Symbol']), y.groupby(values['Symbol'])
+
+        dx = x - grouped_x.transform('mean')
+        dy = y - grouped_y.transform('mean')
+        variance = (dx * dx).groupby(values['Symbol']).sum()
+        covariance = (dx * dy).groupby(values['Symbol']).sum()
+
+        return covariance / variance.where(variance > 0)
+
+    @METRICS.timed("process.trend_features_frame")
+    def process_trend_features_frame(self, **kwargs):
+        # Multi-year trend features of every company, one row per symbol:
+        # - RevenueCAGR, NetIncomeCAGR: compound annual growth over all annual reports,
+        # - GrossMarginMean, GrossMarginStd, OperatingMarginStd: level and stability of the margins,
+        # - FreeCashFlow (latest), FreeCashFlowPositiveShare, FreeCashFlowMargin: operating cash flow minus capex,
+        # - ReturnOnEquity (latest) and ReturnOnEquityTrend: net income over shareholder equity and its slope per year,
+        # - RevenueGrowthYoY: last four quarters over the four before, when quarterlyReports are present.
+
+        income_data = kwargs.get("income_data")
+        balance_data = kwargs.get("balance_data")
+        cash_flow_data = kwargs.get("cash_flow_data")
+
+        history = self._statement_history(income_data, balance_data, cash_flow_data)
+
+        revenue = history['totalRevenue'].where(history['totalRevenue'] > 0)
+        history['GrossMargin'] = history['grossProfit'] / revenue
+        history['OperatingMargin'] = history['operatingIncome'] / revenue
+        history['FreeCashFlow'] = history['operatingCashflow'] - history['capitalExpenditures'].abs()
+        history['ReturnOnEquity'] = history['netIncome'] / history['totalShareholderEquity'].where(history['totalShareholderEquity'] > 0)
+
+        grouped = history.groupby('Symbol')
+        free_cash_flow = history.loc[history['FreeCashFlow'].notna()]
+        fcf_grouped = free_cash_flow.groupby('Symbol')
+
+        features = pd.DataFrame({
+            'RevenueCAGR': self._cagr(history, 'totalRevenue'),
+            'NetIncomeCAGR': self._cagr(history, 'netIncome'),
+            'GrossMarginMean': grouped['GrossMargin'].mean(),
+            'GrossMarginStd': grouped['GrossMargin'].std(),
+            'OperatingMarginStd': grouped['OperatingMargin'].std(),
+            'FreeCashFlow': grouped['FreeCashFlow'].last(),
+            'FreeCashFlowPositiveShare': (free_cash_flow['FreeCashFlow'] > 0).groupby(free_cash_flow['Symbol']).mean(),
+            'FreeCashFlowMargin': fcf_grouped['FreeCashFlow'].sum() / fcf_grouped['totalRevenue'].sum(min_count = 1),
+            'ReturnOnEquity': grouped['ReturnOnEquity'].last(),
+            'ReturnOnEquityTrend': self._slope(history, 'ReturnOnEquity'),
+        })
+
+        quarterly = self._reports_frame(income_data, ['totalRevenue'], 'quarterlyReports')
+        quarterly['totalRevenue'] = pd.to_numeric(quarterly['totalRevenue'], errors = 'coerce')
+        quarterly = quarterly.dropna().sort_values(['Symbol', 'FiscalDateEnding'])
+        quarters_back = quarterly.groupby('Symbol').cumcount(ascending = False)
+        recent = quarterly.loc[quarters_back < 4].groupby('Symbol')['totalRevenue'].sum(min_count = 4)
+        prior = quarterly.loc[(quarters_back >= 4) & (quarters_back < 8)].groupby('Symbol')['totalRevenue'].sum(min_count = 4)
+        features['RevenueGrowthYoY'] = recent / prior.where(prior > 0) - 1
+
+        features = features.replace([np.inf, -np.inf], np.nan)
+        features.index.name = 'Symbol'
+
+        return features.reset_index()
+
+    def frame_to_records(self, **kwargs):
+        # Adapter from the columnar `*_frame` outputs to the list-of-dicts shape of the original methods.
+        # Missing (NaN) values are left out of each record, as `drop_unwanted_values` does.
+        # Pass-through numeric fields come back as floats rather than the raw API strings.
+
+        frame = kwargs.get("frame")
+
+        return [{key: value for key, value in record.items() if not pd.isna(value)}
+                for record in frame.to_dict('records')]
@@ -0,0 +1,149 @@
+# fundamental_pipeline.py
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_processing import OVERVIEW_TEXT_FIELDS
+from metrics import METRICS
+
+
+# Alpha Vantage function -> `DataProcessor` columnar method producing its processed frame
+PROCESSORS = {
+    "OVERVIEW": "process_fundamental_data_overview_frame",
+    "INCOME_STATEMENT": "process_fundamental_data_income_frame",
+    "BALANCE_SHEET": "process_fundamental_data_balance_sheet_frame",
+    "CASH_FLOW": "process_fundamental_data_cash_flow_frame",
+}
+# Statements needed by `DataProcessor.process_trend_features_frame`, written under the name TRENDS
+TREND_FUNCTIONS = ["INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW"]
+TEXT_COLUMNS = set(OVERVIEW_TEXT_FIELDS) | {"FiscalDateEnding"}
+
+
+class FundamentalPipeline:
+    """
+    Streaming fetch -> clean -> process -> store pipeline for fundamental data.
+
+    Raw responses are committed to the `FundamentalStore` one by one as they arrive and are not kept in memory.
+    They are then read back `batch_size` symbols at a time, turned into the processed frames of `DataProcessor`
+    (and the trend features when all statements are processed), and appended to one Parquet file per data type
+    under `output_path`. Peak memory is bounded by the batch size rather than the size of the universe.
+    """
+    def __init__(self, data_fetcher, data_processor, output_path, batch_size = 500):
+
+        self.data_fetcher = data_fetcher
+        self.data_processor = data_processor
+        self.output_path = output_path
+        self.batch_size = batch_size
+        os.makedirs(output_path, exist_ok = True)
+
+    def _path(self, name):
+        return os.path.join(self.output_path, f"{name}.parquet")
+
+    def _raw_batches(self, symbols_list, functions):
+        # Yields {function: [raw responses]} for one chunk of symbols at a time
+        store = self.data_fetcher.fundamental_store
+        for start in range(0, len(symbols_list), self.batch_size):
+            batch = symbols_list[start:start + self.batch_size]
+            yield {function: next(store.iter_many(function, batch, self.batch_size)) for function in functions}
+
+    def _processed_batches(self, raw_batches, threshold_date):
+        # Yields {name: processed frame} for every raw batch, dropping the raw responses once processed
+        for raw in raw_batches:
+            frames = {function: getattr(self.data_processor, PROCESSORS[function])(stock_data = raw[function],
+                                                                                   threshold_date = threshold_date)
+                      for function in raw}
+
+            if all(function in raw for function in TREND_FUNCTIONS):
+                frames["TRENDS"] = self.data_processor.process_trend_features_frame(
+                    income_data = raw["INCOME_STATEMENT"],
+                    balance_data = raw["BALANCE_SHEET"],
+                    cash_flow_data = raw["CASH_FLOW"],
+                )
+
+            del raw
+            yield frames
+
+    @staticmethod
+    def _to_table(frame):
+        # Fixed column types, so a batch where a column happens to be all missing still matches the file schema
+        schema = pa.schema([(column, pa.string() if column in TEXT_COLUMNS else pa.float64()) for column in frame.columns])
+        frame = frame.astype({column: object for column in frame.columns if column in TEXT_COLUMNS})
+        return pa.Table.from_pandas(frame, schema = schema, preserve_index = False)
+
+    def _write(self, processed_batches):
+        # Appends every processed frame to its Parquet file, one row group per batch
+        writers = {}
+        rows = {}
+        try:
+            for frames in processed_batches:
+                for name, frame in frames.items():
+                    table = self._to_table(frame)
+                    if name not in writers:
+                        writers[name] = pq.ParquetWriter(self._path(name), table.schema)
+                        rows[name] = 0
+                    writers[name].write_table(table)
+                    rows[name] += len(frame)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        return rows
+
+    def _empty_frame(self, name):
+        # Frame with no rows but the columns and types of a written file, for names nothing was written under
+        if name == "TRENDS":
+            frame = self.data_processor.process_trend_features_frame(income_data = [], balance_data = [],
+                                                                     cash_flow_data = [])
+        else:
+            frame = getattr(self.data_processor, PROCESSORS[name])(stock_data = [])
+        return self._to_table(frame).to_pandas()
+
+    @METRICS.timed("pipeline.run")
+    def run(self, **kwargs):
+        """
+        Fetches the missing or stale fundamental data of a list of symbols, then processes and stores it batch by batch.
+
+        Args:
+        - symbols_list (list of str): Symbols to process.
+        - functions (list of str): Alpha Vantage functions to process, keys of PROCESSORS.
+        - threshold_date (str): Oldest fiscal date kept in the statement frames. Default is '2021-01-01'.
+
+        Returns:
+        - rows (dict): Number of rows written per data type (the functions, plus TRENDS when all statements
+          are processed).
+        """
+        symbols_list = list(kwargs.get("symbols_list"))
+        functions = kwargs.get("functions")
+        threshold_date = kwargs.get("threshold_date", '2021-01-01')
+
+        self.data_fetcher.fetch_fundamentals_bundle(symbols_list = symbols_list, functions = functions, load = False)
+
+        # Outputs of a previous run are replaced, also when no symbol is left to write
+        for name in list(functions) + ["TRENDS"]:
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+        raw_batches = self._raw_batches(symbols_list, functions)
+        rows = self._write(self._processed_batches(raw_batches, threshold_date))
+
+        print(f"Processed {len(symbols_list)} symbols in batches of {self.batch_size}: "
+              + ", ".join(f"{name} {count} rows" for name, count in rows.items()))
+
+        return rows
+
+    def load(self, name, symbols_list = None):
+        """
+        Loads a processed frame written by `run`, optionally only for some symbols.
+        Returns a frame with the processed columns and no rows when nothing was written under that name
+        (e.g. when a screen passed no symbols), so the screens and the pre-scorer work on it unchanged.
+        """
+        if not os.path.exists(self._path(name)):
+            return self._empty_frame(name)
+
+        filters = None
+        if symbols_list is not None:
+            filters = [("Symbol", "in", list(symbols_list))]
+        return pd.read_parquet(self._path(name), filters = filters)
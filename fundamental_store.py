@@ -0,0 +1,145 @@
+# fundamental_store.py
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date
+
+from helpers import loads_clean
+
+
+class FundamentalStore:
+    """
+    Per-symbol on-disk cache for raw Alpha Vantage fundamental data responses, backed by SQLite.
+
+    Every response is stored as zlib-compressed JSON under its (symbol, function) key together with the
+    time it was fetched and the latest reporting period it covers, and is committed as soon as it is written.
+    A crashed run therefore keeps everything fetched so far, and a rerun only requests symbols that are
+    missing or stale.
+
+    Staleness is decided per function:
+    - functions with an entry in `ttl` (by default OVERVIEW, one day) are refreshed once the entry is older
+      than the TTL in seconds;
+    - statement functions (INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW, ...) are refreshed once the stored
+      OVERVIEW reports a `LatestQuarter` newer than the latest `fiscalDateEnding` in the stored statement.
+    """
+    def __init__(self, db_path, ttl = None):
+
+        self.db_path = db_path
+        self.ttl = ttl if ttl is not None else {"OVERVIEW": 24 * 60 * 60}
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread = False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fundamentals (
+                symbol TEXT NOT NULL,
+                function TEXT NOT NULL,
+                fetch_date TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                latest_period TEXT,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (symbol, function)
+            )
+            """
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def _latest_period(function, payload):
+        # OVERVIEW carries the latest reported quarter directly, statements carry a list of reports
+        if function == "OVERVIEW":
+            return payload.get("LatestQuarter")
+
+        fiscal_dates = [report.get("fiscalDateEnding")
+                        for reports_key in ("quarterlyReports", "annualReports")
+                        for report in payload.get(reports_key) or []
+                        if report.get("fiscalDateEnding")]
+
+        return max(fiscal_dates) if fiscal_dates else None
+
+    def put(self, symbol, function, payload):
+        """
+        Stores the raw JSON response for one symbol and function and commits it immediately.
+        """
+        blob = zlib.compress(json.dumps(payload).encode("utf-8"))
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?, ?, ?)",
+                (symbol, function, date.today().isoformat(), time.time(), self._latest_period(function, payload), blob),
+            )
+            self.connection.commit()
+
+    def count(self, function):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM fundamentals WHERE function = ?", (function,)).fetchone()[0]
+
+    def get_many(self, function, symbols_list):
+        """
+        Returns the stored JSON responses of a function for the given symbols, in the order of symbols_list.
+        Symbols without a stored response are left out. Sentinel values are dropped while decoding, so
+        responses stored before parse-time cleaning come back clean too.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT symbol, payload FROM fundamentals WHERE function = ?", (function,)).fetchall()
+
+        payloads = {symbol: blob for symbol, blob in rows}
+
+        return [loads_clean(zlib.decompress(payloads[symbol])) for symbol in symbols_list if symbol in payloads]
+
+    def iter_many(self, function, symbols_list, batch_size = 200):
+        """
+        Yields the stored JSON responses of a function for the given symbols in batches of at most batch_size,
+        in the order of symbols_list. Only one batch is read and decoded at a time.
+        """
+        for start in range(0, len(symbols_list), batch_size):
+            batch = list(symbols_list[start:start + batch_size])
+            placeholders = ", ".join("?" * len(batch))
+            with self.lock:
+                rows = self.connection.execute(
+                    f"SELECT symbol, payload FROM fundamentals WHERE function = ? AND symbol IN ({placeholders})",
+                    [function] + batch,
+                ).fetchall()
+
+            payloads = {symbol: blob for symbol, blob in rows}
+            yield [loads_clean(zlib.decompress(payloads[symbol])) for symbol in batch if symbol in payloads]
+
+    def _metadata(self, function):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT symbol, fetched_at, latest_period FROM fundamentals WHERE function = ?", (function,)
+            ).fetchall()
+        return {symbol: (fetched_at, latest_period) for symbol, fetched_at, latest_period in rows}
+
+    def stale_symbols(self, function, symbols_list):
+        """
+        Returns the symbols from symbols_list whose response for `function` is missing or stale.
+        """
+        metadata = self._metadata(function)
+        ttl = self.ttl.get(function)
+        now = time.time()
+
+        latest_quarters = {}
+        if function != "OVERVIEW":
+            latest_quarters = {symbol: latest_period for symbol, (_, latest_period) in self._metadata("OVERVIEW").items()}
+
+        stale = []
+        for symbol in symbols_list:
+            if symbol not in metadata:
+                stale.append(symbol)
+                continue
+
+            fetched_at, latest_period = metadata[symbol]
+            latest_quarter = latest_quarters.get(symbol)
+
+            if ttl is not None and now - fetched_at > ttl:
+                stale.append(symbol)
+            elif latest_quarter and latest_period and latest_quarter > latest_period:
+                stale.append(symbol)
+
+        return stale
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
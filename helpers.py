@@ -1,6 +1,13 @@
+import json
+
+import numpy as np
 import pandas as pd
 
 
+UNWANTED_VALUES = (None, 'None', '', ' ', '-')
+UNWANTED_STRINGS = frozenset(value for value in UNWANTED_VALUES if value is not None)
+
+
 def save_dataframe_to_csv(dataframe, file_path):
     dataframe.to_csv(file_path, index = False)
     print(f"Data saved to: {file_path}")
@@ -10,11 +17,31 @@ def safe_divide(numerator, denominator):
     return float(numerator) / float(denominator) if float(denominator) != 0 else 0
 
 
+def index_by_key(records, key = "Symbol"):
+    # Groups a list of dicts into a dict of lists keyed by record[key], preserving record order
+    index = {}
+    for record in records:
+        index.setdefault(record.get(key), []).append(record)
+    return index
+
+
+def drop_unwanted_values(obj):
+    # `json.loads` object_hook: drops the sentinel values of every JSON object while it is being parsed,
+    # so missing fields are simply absent (NaN once in a DataFrame) and no second pass over the tree is needed
+    return {key: value for key, value in obj.items()
+            if value is not None and not (value.__class__ is str and value in UNWANTED_STRINGS)}
+
+
+def loads_clean(text):
+    # Parses Alpha Vantage JSON with sentinel values removed in the same pass
+    return json.loads(text, object_hook = drop_unwanted_values)
+
+
 def remove_unwanted_values(item):
     if isinstance(item, list):
-        return [remove_unwanted_values(x) for x in item if x not in (None, 'None', '', ' ', '-')]
+        return [remove_unwanted_values(x) for x in item if x not in UNWANTED_VALUES]
     elif isinstance(item, dict):
-        return {k: remove_unwanted_values(v) for k, v in item.items() if v not in (None, 'None', '', ' ', '-')}
+        return {k: remove_unwanted_values(v) for k, v in item.items() if v not in UNWANTED_VALUES}
     else:
         return item
     
@@ -22,3 +49,17 @@ def to_float(value, default = 0):
     if (value is None) | (value == 'None'):
         return default
     return float(value)
+
+
+def to_float_column(series, default = 0):
+    # Vectorized `to_float` for a pandas Series: unparsable and missing values become `default`
+    return pd.to_numeric(series, errors = 'coerce').fillna(default)
+
+
+def safe_divide_columns(numerator, denominator):
+    # Vectorized `safe_divide` for pandas Series: rows with a zero denominator give 0
+    numerator = numerator.to_numpy(dtype = float)
+    denominator = denominator.to_numpy(dtype = float)
+    result = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out = result, where = denominator != 0)
+    return result
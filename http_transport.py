@@ -0,0 +1,52 @@
+# http_transport.py
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpTransport:
+    """
+    Shared HTTP client for every Alpha Vantage request.
+
+    One `requests.Session` keeps a pool of up to `pool_size` keep-alive connections per host, so consecutive
+    requests reuse the TCP/TLS connection instead of opening a new one each time. Responses are requested
+    gzip-compressed, every request gets a (connect, read) timeout, and connection errors and 5xx/429 statuses
+    are retried by the adapter with exponential backoff before an exception reaches the caller.
+    """
+    def __init__(self, pool_size = 8, connect_timeout = 5, read_timeout = 30, retries = 3, backoff_factor = 0.5,
+                 status_forcelist = (429, 500, 502, 503, 504)):
+
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(total = retries, connect = retries, read = retries, status = retries,
+                      backoff_factor = backoff_factor, status_forcelist = status_forcelist,
+                      allowed_methods = frozenset(["GET"]), raise_on_status = False)
+        adapter = HTTPAdapter(pool_connections = 2, pool_maxsize = pool_size, max_retries = retry, pool_block = True)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+
+    def get(self, url, timeout = None):
+        """
+        Sends a GET request over the pooled session and returns the response.
+        `response.elapsed` holds the time to the response headers, e.g. to measure latency per request.
+
+        Raises:
+        - requests.RequestException: If the request still fails after the adapter retries, or the final status
+          is an HTTP error.
+        """
+        response = self.session.get(url, timeout = timeout or self.timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,101 @@
+# llm_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class LLMResponseCache:
+    """
+    Persistent, content-addressed cache of LLM responses backed by SQLite.
+
+    Responses are keyed on a SHA-256 hash of the model name, the prompt template version and the
+    canonicalized company payload, so a company is only sent to the model again when its fundamentals,
+    the prompt or the model change. Entries older than `max_age_days` are evicted, and the cache is trimmed
+    to the `max_entries` most recently used entries. Hits and misses are counted for the run.
+    """
+    def __init__(self, db_path, max_entries = 50000, max_age_days = 90):
+
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread = False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                response TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(**kwargs):
+        """
+        Builds the cache key of a request.
+
+        Args:
+        - model (str): LLM model name.
+        - prompt_version (str): Version of the prompt template.
+        - payload: JSON-serializable company data sent with the prompt.
+
+        Returns:
+        - key (str): Hex SHA-256 digest of the canonical JSON of all three.
+        """
+        canonical = json.dumps(
+            {"model": kwargs.get("model"), "prompt_version": kwargs.get("prompt_version"), "payload": kwargs.get("payload")},
+            sort_keys = True, separators = (",", ":"), default = str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached response for key, or None, and counts the hit or miss.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, now, now, response))
+            self.connection.commit()
+
+    def evict(self):
+        """
+        Removes entries older than max_age_days and trims the cache to the max_entries most recently used.
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_days * 24 * 60 * 60,))
+            self.connection.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self.connection.commit()
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0
+        print(f"LLM response cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1%} hit rate)")
+
+    def close(self):
+        self.evict()
+        with self.lock:
+            self.connection.close()
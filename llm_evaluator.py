@@ -0,0 +1,253 @@
+# llm_evaluator.py
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+from tqdm import tqdm
+
+from metrics import METRICS
+from rate_limiter import TokenBucket, backoff_delay
+from prompt_builder import count_tokens, build_batch_prompt
+from response_parser import parse_response, repair_json
+
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+
+class LLMEvaluator:
+    """
+    LLMEvaluator class for sending company evaluation prompts to the OpenAI chat completion API concurrently.
+
+    Up to `max_concurrency` requests are in flight at once. Two token buckets keep the run within the
+    account limits: one for requests per minute and one for tokens per minute, where the tokens of a request
+    are counted from the prompt plus `max_response_tokens`. Rate-limit and transient API errors are
+    retried with jittered exponential backoff. With an `LLMResponseCache`, companies whose cache key is
+    already stored are answered from the cache without calling the API. An optional batch mode packs several
+    companies into one request to save per-request overhead and rate-limit slots.
+    """
+    def __init__(self, model,
+                 max_concurrency = 4,
+                 requests_per_minute = 200,
+                 tokens_per_minute = 40000,
+                 max_response_tokens = 1000,
+                 max_attempts = 8,
+                 request_timeout = 120,
+                 api_base = None,
+                 cache = None):
+
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_response_tokens = max_response_tokens
+        self.max_attempts = max_attempts
+        self.request_timeout = request_timeout
+        self.api_base = api_base
+        self.cache = cache
+        self.backoff_base_delay = 2.0
+        self.backoff_max_delay = 120.0
+        self.request_limiter = TokenBucket(requests_per_minute)
+        self.token_limiter = TokenBucket(tokens_per_minute, burst = tokens_per_minute)
+
+    def estimate_tokens(self, text):
+        # Token estimate of a prompt used for the tokens-per-minute budget
+        return count_tokens(text, self.model)
+
+    def _complete(self, company_symbol, input_text):
+        """
+        Sends one prompt to the chat completion API, retrying rate-limit and transient errors.
+
+        Args:
+        - company_symbol (str): Symbol of the evaluated company, used in log messages.
+        - input_text (str): Full prompt text.
+
+        Returns:
+        - content (str or None): Content of the model response, or None if every attempt failed.
+        """
+        llm_message = [{"role": "user", "content": input_text}]
+        request_tokens = self.estimate_tokens(input_text) + self.max_response_tokens
+
+        for attempt in range(self.max_attempts):
+            self.request_limiter.acquire()
+            self.token_limiter.acquire(request_tokens)
+            start = time.perf_counter()
+            try:
+                response = openai.ChatCompletion.create(
+                    model = self.model,
+                    messages = llm_message,
+                    request_timeout = self.request_timeout,
+                    api_base = self.api_base,
+                )
+                METRICS.observe_request("openai.chat", time.perf_counter() - start)
+                usage = response.get("usage") or {}
+                METRICS.increment("llm_prompt_tokens", usage.get("prompt_tokens", 0))
+                METRICS.increment("llm_completion_tokens", usage.get("completion_tokens", 0))
+                return response["choices"][0]["message"]["content"]
+            except RETRYABLE_ERRORS as e:
+                METRICS.observe_request("openai.chat", time.perf_counter() - start, "retried")
+                delay = backoff_delay(attempt, self.backoff_base_delay, self.backoff_max_delay)
+                print(f"Error evaluating {company_symbol}: {e}. Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+            except Exception as e:
+                METRICS.observe_request("openai.chat", time.perf_counter() - start, "failed")
+                print(f"Error evaluating {company_symbol}: {e}. Skipping...")
+                return None
+
+        METRICS.increment("llm_gave_up")
+        print(f"Failed to evaluate {company_symbol} after {self.max_attempts} attempts. Skipping...")
+        return None
+
+    def _pack_batches(self, symbols, contexts, batch_size, max_batch_tokens):
+        # Greedily packs symbols into batches of at most batch_size companies and max_batch_tokens context tokens
+        batches = []
+        batch = []
+        batch_tokens = 0
+
+        for symbol in symbols:
+            tokens = count_tokens(contexts[symbol], self.model)
+            if batch and (len(batch) >= batch_size or batch_tokens + tokens > max_batch_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(symbol)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    @staticmethod
+    def split_batch_response(content, symbols):
+        """
+        Splits a batch response (a JSON object keyed by symbol) into per-company responses in the
+        single-company `data = {...}` format. The usual quoting issues are repaired with `repair_json` before
+        giving up on the whole batch, and every per-company answer must pass `parse_response`. Symbols missing
+        from the response or with an invalid answer are left out.
+        """
+        match = re.search(r"\{.*\}", content or "", re.DOTALL)
+        if match is None:
+            return {}
+
+        try:
+            payload = json.loads(match.group(0))
+        except ValueError:
+            try:
+                payload = json.loads(repair_json(match.group(0)))
+            except ValueError:
+                return {}
+
+        if not isinstance(payload, dict):
+            return {}
+
+        results = {}
+        for symbol in symbols:
+            if not isinstance(payload.get(symbol), dict):
+                continue
+            company_content = "data = " + json.dumps(payload[symbol])
+            try:
+                parse_response(company_content)
+            except (ValueError, TypeError):
+                continue
+            results[symbol] = company_content
+
+        return results
+
+    @METRICS.timed("llm.evaluate")
+    def evaluate(self, **kwargs):
+        """
+        Evaluates a set of companies concurrently.
+
+        With batch_size above 1, companies are first packed into multi-company prompts (see `build_batch_prompt`)
+        and the keyed JSON answer is split back into one response per company. Companies missing from a batch
+        answer, or whose answer does not parse, fall back to their single-company prompt.
+
+        Args:
+        - prompts (dict): Maps each company symbol to its full single-company prompt text.
+        - on_result (callable, optional): Called as on_result(company_symbol, content) in the calling thread
+          as soon as each evaluation finishes, e.g. to save it.
+        - cache_keys (dict, optional): Maps company symbols to their `LLMResponseCache` key. Used only when
+          the evaluator has a cache.
+        - contexts (dict, optional): Maps company symbols to their context from `build_company_context`.
+          Required for batch mode.
+        - batch_size (int): Maximum number of companies per request. Default is 1 (no batching).
+        - max_batch_tokens (int): Maximum context tokens per batch request. Default is 6000.
+
+        Returns:
+        - final_response (list): List of [company_symbol, content] pairs for the successful evaluations,
+          in the order of prompts.
+        """
+        prompts = kwargs.get("prompts")
+        on_result = kwargs.get("on_result")
+        cache_keys = kwargs.get("cache_keys") or {}
+        contexts = kwargs.get("contexts")
+        batch_size = kwargs.get("batch_size", 1)
+        max_batch_tokens = kwargs.get("max_batch_tokens", 6000)
+
+        results = {}
+        start_time = time.time()
+        use_cache = self.cache is not None
+
+        def save_result(company_symbol, content, from_cache = False):
+            results[company_symbol] = content
+            if use_cache and not from_cache and cache_keys.get(company_symbol):
+                self.cache.put(cache_keys[company_symbol], content)
+            if on_result is not None:
+                on_result(company_symbol, content)
+
+        pending = []
+        for company_symbol in prompts:
+            cache_key = cache_keys.get(company_symbol)
+            content = self.cache.get(cache_key) if use_cache and cache_key else None
+            if use_cache and cache_key:
+                METRICS.increment("llm_cache_hits" if content is not None else "llm_cache_misses")
+
+            if content is not None:
+                save_result(company_symbol, content, from_cache = True)
+            else:
+                pending.append(company_symbol)
+
+        with ThreadPoolExecutor(max_workers = self.max_concurrency) as executor:
+            if batch_size > 1 and contexts:
+                batches = self._pack_batches(pending, contexts, batch_size, max_batch_tokens)
+                futures = {}
+                for batch in batches:
+                    batch_prompt = build_batch_prompt(contexts = {symbol: contexts[symbol] for symbol in batch})
+                    futures[executor.submit(self._complete, ",".join(batch), batch_prompt)] = batch
+
+                pending = []
+                for future in tqdm(as_completed(futures), total = len(futures), desc = "Analysing batches", unit = "batch"):
+                    batch = futures[future]
+                    batch_results = self.split_batch_response(future.result(), batch)
+
+                    for company_symbol in batch:
+                        if company_symbol in batch_results:
+                            save_result(company_symbol, batch_results[company_symbol])
+                        else:
+                            pending.append(company_symbol)
+
+                if pending:
+                    print(f"{len(pending)} companies missing or invalid in batch responses. Falling back to single requests...")
+
+            futures = {executor.submit(self._complete, company_symbol, prompts[company_symbol]): company_symbol
+                       for company_symbol in pending}
+
+            for future in tqdm(as_completed(futures), total = len(futures), desc = "Analysing companies", unit = "stock"):
+                company_symbol = futures[future]
+                content = future.result()
+
+                if content is not None:
+                    save_result(company_symbol, content)
+
+        elapsed_time = time.time() - start_time
+        print(f"Total time elapsed: {elapsed_time:.2f} seconds")
+
+        return [[company_symbol, results[company_symbol]] for company_symbol in prompts if company_symbol in results]
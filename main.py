@@ -1,13 +1,19 @@
 # main.py
 
 import os
-import openai
-import pandas as pd
 import time
-from tqdm import tqdm
+import openai
 
 from data_fetcher import DataFetcher
 from data_processing import DataProcessor
+from llm_evaluator import LLMEvaluator
+from result_sink import ResultSink
+from llm_cache import LLMResponseCache
+from prompt_builder import build_company_context, count_tokens
+from screening import UniverseScreener
+from prescoring import BuffettPreScorer
+from fundamental_pipeline import FundamentalPipeline
+from metrics import METRICS
 
 from prompt_engineering import (
     prompt_task,
@@ -15,6 +21,7 @@ from prompt_engineering import (
     type_response,
     format_response,
     llm_model,
+    prompt_version,
 )
 
 
@@ -37,160 +44,270 @@ def main():
     except Exception as e:
         print(f"Error fetching stocks listing: {e}")
 
+    # Cheap data (latest prices, then OVERVIEW) narrows the universe before the statement fetches and the LLM
+    screening_criteria = {
+        "symbols": ["LCID", "RIVN", "U"],
+        "max_stock_price": 10000,
+    }
+    screener = UniverseScreener(screening_criteria)
+    statement_functions = ["INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW"]
+    prompt_max_tokens = int(os.getenv("PROMPT_MAX_TOKENS", 1500))
+
+    llm_evaluator = LLMEvaluator(
+        model=llm_model,
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+        requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", 200)),
+        tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", 40000)),
+    )
+    tokens_per_request = (
+        count_tokens(f"{prompt_task} {prompt_task_support}. {type_response}: {format_response}")
+        + prompt_max_tokens
+        + llm_evaluator.max_response_tokens
+    )
+
+    # The symbols whitelist needs no data, so it is applied before the price stage
+    symbols_list = screener.screen_symbols(symbols_list=symbols_list)
+    fundamental_store = data_fetcher.fundamental_store
+    screener.estimate_cost(
+        stage="before price fetch",
+        api_calls=len(
+            data_fetcher.stale_price_symbols(symbols_list=symbols_list, period="monthly")
+        )
+        + len(fundamental_store.stale_symbols("OVERVIEW", symbols_list))
+        + len(statement_functions) * len(symbols_list),
+        requests_per_minute=data_fetcher.rate_limiter.requests_per_minute,
+        llm_requests=len(symbols_list),
+        tokens_per_request=tokens_per_request,
+    )
+
     try:
-        max_stock_price = 10000
         df_stocks_price = data_fetcher.fetch_latest_stock_price_vol(
-            symbols_list=symbols_list, period="monthly", max_stock_price=max_stock_price
+            symbols_list=symbols_list,
+            period="monthly",
+            refresh=True,
+            **screener.price_filters(),
         )
     except Exception as e:
         print(f"Error fetching stocks listing: {e}")
 
+    symbols_list = screener.screen_prices(df_stocks_price=df_stocks_price)
+    screener.estimate_cost(
+        stage="after price screen",
+        api_calls=len(fundamental_store.stale_symbols("OVERVIEW", symbols_list))
+        + len(statement_functions) * len(symbols_list),
+        requests_per_minute=data_fetcher.rate_limiter.requests_per_minute,
+        llm_requests=len(symbols_list),
+        tokens_per_request=tokens_per_request,
+    )
+
+    # Raw responses are streamed through the store and processed batch by batch into Parquet files
+    fundamental_pipeline = FundamentalPipeline(
+        data_fetcher,
+        data_processor,
+        f"{data_path}processed/",
+        batch_size=int(os.getenv("PIPELINE_BATCH_SIZE", 500)),
+    )
+
     try:
-        stock_data_overview = data_fetcher.fetch_fundamental_data(
-            symbols_list=symbols_list, fundamental_data="OVERVIEW"
-        )
-        all_results_overview = data_processor.process_fundamental_data_overview(
-            stock_data=stock_data_overview
-        )
+        fundamental_pipeline.run(symbols_list=symbols_list, functions=["OVERVIEW"])
     except Exception as e:
-        print(f"Error fetching and processing overview data: {e}")
+        print(f"Error fetching overview data: {e}")
 
     try:
-        stock_data_income_statement = data_fetcher.fetch_fundamental_data(
-            symbols_list=symbols_list, fundamental_data="INCOME_STATEMENT"
-        )
-        all_results_income_statement = data_processor.process_fundamental_data_income(
-            stock_data=stock_data_income_statement
-        )
+        df_overview = fundamental_pipeline.load("OVERVIEW")
     except Exception as e:
-        print(f"Error fetching and processing income statement data: {e}")
+        print(f"Error processing overview data: {e}")
+
+    symbols_list = screener.screen_overview(df_overview=df_overview)
+    df_overview = df_overview.loc[df_overview["Symbol"].isin(symbols_list)]
+    all_results_overview = data_processor.frame_to_records(frame=df_overview)
+    screener.estimate_cost(
+        stage="after overview screen",
+        api_calls=sum(
+            len(fundamental_store.stale_symbols(function, symbols_list))
+            for function in statement_functions
+        ),
+        requests_per_minute=data_fetcher.rate_limiter.requests_per_minute,
+        llm_requests=len(symbols_list),
+        tokens_per_request=tokens_per_request,
+    )
 
     try:
-        stock_data_balance_sheet = data_fetcher.fetch_fundamental_data(
-            symbols_list=symbols_list, fundamental_data="BALANCE_SHEET"
-        )
-        all_results_balance_sheet = (
-            data_processor.process_fundamental_data_balance_sheet(
-                stock_data=stock_data_balance_sheet
-            )
+        fundamental_pipeline.run(
+            symbols_list=symbols_list, functions=statement_functions
         )
     except Exception as e:
-        print(f"Error fetching and processing balance sheet data: {e}")
+        print(f"Error fetching fundamental data: {e}")
 
     try:
-        stock_data_cash_flow = data_fetcher.fetch_fundamental_data(
-            symbols_list=symbols_list, fundamental_data="CASH_FLOW"
+        df_income_statement = fundamental_pipeline.load("INCOME_STATEMENT")
+        all_results_income_statement = data_processor.frame_to_records(
+            frame=df_income_statement
         )
-        all_results_cash_flow = data_processor.process_fundamental_data_cash_flow(
-            stock_data=stock_data_cash_flow
+    except Exception as e:
+        print(f"Error processing income statement data: {e}")
+
+    try:
+        df_balance_sheet = fundamental_pipeline.load("BALANCE_SHEET")
+        all_results_balance_sheet = data_processor.frame_to_records(
+            frame=df_balance_sheet
         )
     except Exception as e:
-        print(f"Error fetching and processing cash flow data: {e}")
+        print(f"Error processing balance sheet data: {e}")
 
-    mask = df_stocks_price["company"].isin(["LCID", "RIVN", "U"])
-    df_stocks_price_temp = df_stocks_price.loc[mask].copy()
+    try:
+        df_cash_flow = fundamental_pipeline.load("CASH_FLOW")
+        all_results_cash_flow = data_processor.frame_to_records(frame=df_cash_flow)
+    except Exception as e:
+        print(f"Error processing cash flow data: {e}")
+
+    try:
+        df_trends = fundamental_pipeline.load("TRENDS")
+    except Exception as e:
+        print(f"Error processing trend features: {e}")
+
+    symbols_list = screener.screen_trends(df_trends=df_trends, symbols_list=symbols_list)
+    all_results_trends = data_processor.frame_to_records(frame=df_trends)
 
     company_symbol_key = "Symbol"
-    final_response = []
-    company_symbol_stock_list = df_stocks_price_temp.loc[:, "company"].reset_index(
-        drop=True
+    all_results_overview = data_processor.index_by_symbol(
+        stock_data=all_results_overview, key=company_symbol_key
+    )
+    all_results_income_statement = data_processor.index_by_symbol(
+        stock_data=all_results_income_statement, key=company_symbol_key
+    )
+    all_results_balance_sheet = data_processor.index_by_symbol(
+        stock_data=all_results_balance_sheet, key=company_symbol_key
+    )
+    all_results_cash_flow = data_processor.index_by_symbol(
+        stock_data=all_results_cash_flow, key=company_symbol_key
     )
-    start_time = time.time()
-    max_attempts = 100
-
-    for company_symbol_stock in tqdm(
-        company_symbol_stock_list, desc="Analysing companies", unit="stock"
-    ):
-        print(f"AI working on company symbol: {company_symbol_stock}...")
-        attempts = 0
-        while attempts < max_attempts:
-            try:
-                """
-                company_symbol_stock = "LCID"
-
-                """
-
-                company_analyze_temp = []
-                company_analyze = []
-
-                company_analyze_temp = data_fetcher.fetch_company_data_by_key(
-                    stock_data=all_results_overview,
-                    key=company_symbol_key,
-                    company_symbol=company_symbol_stock,
-                )
-
-                company_analyze.append(company_analyze_temp)
-
-                company_analyze_temp = data_fetcher.fetch_company_data_by_key(
-                    stock_data=all_results_income_statement,
-                    key=company_symbol_key,
-                    company_symbol=company_symbol_stock,
-                )
-
-                company_analyze.append(company_analyze_temp)
-
-                company_analyze_temp = data_fetcher.fetch_company_data_by_key(
-                    stock_data=all_results_balance_sheet,
-                    key=company_symbol_key,
-                    company_symbol=company_symbol_stock,
-                )
-
-                company_analyze.append(company_analyze_temp)
-
-                company_analyze_temp = data_fetcher.fetch_company_data_by_key(
-                    stock_data=all_results_cash_flow,
-                    key=company_symbol_key,
-                    company_symbol=company_symbol_stock,
-                )
-
-                company_analyze.append(company_analyze_temp)
-
-                question = f"{prompt_task} {company_symbol_stock}, {prompt_task_support}. All {company_symbol_stock}'s {type_response}: {format_response}"
-                input_text = question + str(company_analyze_temp.copy())
-
-                llm_model = llm_model
-                llm_message = [{"role": "user", "content": input_text}]
-
-                response = openai.ChatCompletion.create(
-                    model=llm_model, messages=llm_message
-                )
-
-                final_response.append(
-                    [company_symbol_stock, response["choices"][0]["message"]["content"]]
-                )
-
-                # Save list to csv file where each row is a list item
-                # Check if the list is not empty
-                if final_response:
-                    # Convert the list to a DataFrame
-                    df = pd.DataFrame(final_response)
-
-                    # Write the DataFrame to a CSV file
-                    df.to_csv(
-                        f"{data_path}final_response.csv", index=False, header=False
-                    )
-
-                print(f"...finished and saved results to {data_path}final_response.csv")
-                break  # Exit the loop if the request is successful
-
-            except Exception as e:
-                print(
-                    f"Error fetching data for {company_symbol_stock}: {e}. Retrying..."
-                )
-                attempts += 1
-                time.sleep(2)  # Wait before retrying the request
-
-            if attempts == max_attempts:
-                print(
-                    f"Failed to fetch data for {company_symbol_stock} after {max_attempts} attempts. Skipping..."
-                )
-
-            time.sleep(
-                1
-            )  # Wait xx seconds between requests to avoid hitting API rate limits
-
-        elapsed_time = time.time() - start_time
-        print(f"Total time elapsed: {elapsed_time:.2f} seconds")
+    all_results_trends = data_processor.index_by_symbol(
+        stock_data=all_results_trends, key=company_symbol_key
+    )
+    company_symbol_stock_list = symbols_list
+
+    # Results are appended per company, so a restarted run skips companies already scored
+    result_sink = ResultSink(f"{data_path}final_response.csv")
+    completed_symbols = result_sink.completed_symbols()
+    if completed_symbols:
+        print(f"Skipping {len(completed_symbols)} companies already saved in {result_sink.file_path}")
+    company_symbol_stock_list = [
+        company_symbol_stock
+        for company_symbol_stock in company_symbol_stock_list
+        if company_symbol_stock not in completed_symbols
+    ]
+
+    # Companies with a clearly high or low quantitative score are saved as they are, only the uncertain band
+    # goes to the LLM
+    pre_scorer = BuffettPreScorer(
+        uncertain_band=(
+            float(os.getenv("PRESCORE_BAND_LOW", 4)),
+            float(os.getenv("PRESCORE_BAND_HIGH", 7)),
+        )
+    )
+    df_pre_scores = pre_scorer.score(
+        df_overview=df_overview,
+        df_balance_sheet=df_balance_sheet,
+        df_cash_flow=df_cash_flow,
+    )
+    needs_llm = pre_scorer.needs_llm(df_pre_scores).reindex(
+        company_symbol_stock_list, fill_value=True
+    )
+    for company_symbol_stock in needs_llm.index[~needs_llm]:
+        result_sink.write(
+            company_symbol_stock,
+            pre_scorer.to_response(df_pre_scores, company_symbol_stock),
+        )
+    print(
+        f"Pre-scored {int((~needs_llm).sum())} companies quantitatively, "
+        f"{int(needs_llm.sum())} go to the LLM"
+    )
+    company_symbol_stock_list = needs_llm.index[needs_llm].tolist()
+
+    prompt_sections = ["Overview", "Income statement", "Balance sheet", "Cash flow", "Multi-year trends"]
+    prompts = {}
+    contexts = {}
+    cache_keys = {}
+    for company_symbol_stock in company_symbol_stock_list:
+        company_analyze_temp = []
+        company_analyze = []
+
+        company_analyze_temp = data_fetcher.fetch_company_data_by_key(
+            stock_data=all_results_overview,
+            key=company_symbol_key,
+            company_symbol=company_symbol_stock,
+        )
+
+        company_analyze.append(company_analyze_temp)
+
+        company_analyze_temp = data_fetcher.fetch_company_data_by_key(
+            stock_data=all_results_income_statement,
+            key=company_symbol_key,
+            company_symbol=company_symbol_stock,
+        )
+
+        company_analyze.append(company_analyze_temp)
+
+        company_analyze_temp = data_fetcher.fetch_company_data_by_key(
+            stock_data=all_results_balance_sheet,
+            key=company_symbol_key,
+            company_symbol=company_symbol_stock,
+        )
+
+        company_analyze.append(company_analyze_temp)
+
+        company_analyze_temp = data_fetcher.fetch_company_data_by_key(
+            stock_data=all_results_cash_flow,
+            key=company_symbol_key,
+            company_symbol=company_symbol_stock,
+        )
+
+        company_analyze.append(company_analyze_temp)
+
+        company_analyze_temp = data_fetcher.fetch_company_data_by_key(
+            stock_data=all_results_trends,
+            key=company_symbol_key,
+            company_symbol=company_symbol_stock,
+        )
+
+        company_analyze.append(company_analyze_temp)
+
+        question = f"{prompt_task} {company_symbol_stock}, {prompt_task_support}. All {company_symbol_stock}'s {type_response}: {format_response}"
+        company_context = build_company_context(
+            sections=dict(zip(prompt_sections, company_analyze)),
+            max_tokens=prompt_max_tokens,
+        )
+        contexts[company_symbol_stock] = company_context
+        prompts[company_symbol_stock] = question + "\n" + company_context
+        cache_keys[company_symbol_stock] = LLMResponseCache.make_key(
+            model=llm_model, prompt_version=prompt_version, payload=company_analyze
+        )
+
+    llm_cache = LLMResponseCache(f"{data_path}llm_cache.sqlite")
+    llm_evaluator.cache = llm_cache
+
+    def save_response(company_symbol_stock, content):
+        result_sink.write(company_symbol_stock, content)
+        print(f"...finished {company_symbol_stock} and saved results to {result_sink.file_path}")
+
+    try:
+        llm_evaluator.evaluate(
+            prompts=prompts,
+            on_result=save_response,
+            cache_keys=cache_keys,
+            contexts=contexts,
+            batch_size=int(os.getenv("LLM_BATCH_SIZE", 1)),
+        )
+    finally:
+        result_sink.close()
+        llm_cache.report()
+        llm_cache.close()
+        data_fetcher.export_request_stats()
+        # Per-stage wall time, per-endpoint latency and throughput, LLM tokens and cache hits of this run
+        METRICS.export_json(f"{data_path}metrics_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        if os.getenv("METRICS_PROMETHEUS_FILE"):
+            METRICS.export_prometheus(os.getenv("METRICS_PROMETHEUS_FILE"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+# metrics.py
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values, quantile):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(quantile * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RunMetrics:
+    """
+    Thread-safe collector of the timings and counters of one run.
+
+    - Stages: wall time and number of calls of a block of work, recorded with the `stage` context manager or
+      the `timed` decorator. Nested stages are timed inclusively (an outer stage includes its inner ones).
+    - Endpoints: latency, status and downloaded bytes of every request to an external API, recorded with
+      `observe_request`, summarised as requests/sec and p50/p95/p99 latency per endpoint.
+    - Counters: any other per-run totals, e.g. LLM tokens in/out and cache hits, recorded with `increment`.
+
+    `summary` returns everything as a dict, written as JSON by `export_json` and in the Prometheus text
+    exposition format (e.g. for the node_exporter textfile collector) by `export_prometheus`.
+    """
+    def __init__(self, prefix = "financial_analysis"):
+
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.stages = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+            self.latencies = defaultdict(list)
+            self.statuses = defaultdict(lambda: defaultdict(int))
+            self.bytes = defaultdict(int)
+            self.first_request = {}
+            self.last_response = {}
+            self.counters = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager adding the wall time of the block to the stage `name`, also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name]["seconds"] += elapsed
+                self.stages[name]["calls"] += 1
+
+    def timed(self, name):
+        """
+        Decorator timing every call of the decorated function as the stage `name`.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe_request(self, endpoint, latency, status = "ok", size = 0):
+        """
+        Records one request to an external API.
+
+        Args:
+        - endpoint (str): Endpoint name, e.g. the Alpha Vantage function or "openai.chat".
+        - latency (float): Seconds from sending the request to having the decoded response.
+        - status (str): Outcome of the request, e.g. "ok", "throttled" or "failed". Default is "ok".
+        - size (int): Bytes downloaded. Default is 0.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            self.bytes[endpoint] += size
+            self.first_request.setdefault(endpoint, now - latency)
+            self.last_response[endpoint] = now
+
+    def increment(self, name, value = 1):
+        with self.lock:
+            self.counters[name] += value
+
+    def summary(self):
+        """
+        Returns the collected metrics as a dict with the run duration, stages, endpoints and counters.
+        """
+        with self.lock:
+            endpoints = {}
+            for endpoint, latencies in self.latencies.items():
+                latencies = sorted(latencies)
+                span = self.last_response[endpoint] - self.first_request[endpoint]
+                endpoints[endpoint] = {
+                    "requests": len(latencies),
+                    "requests_per_second": len(latencies) / span if span > 0 else 0.0,
+                    "latency_mean": sum(latencies) / len(latencies),
+                    **{f"latency_p{int(quantile * 100)}": percentile(latencies, quantile) for quantile in QUANTILES},
+                    "latency_sum": sum(latencies),
+                    "bytes": self.bytes[endpoint],
+                    "statuses": dict(self.statuses[endpoint]),
+                }
+
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "duration_seconds": time.time() - self.started,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "endpoints": endpoints,
+                "counters": dict(self.counters),
+            }
+
+    def to_prometheus(self, summary = None):
+        """
+        Renders a summary in the Prometheus text exposition format.
+        """
+        summary = summary or self.summary()
+        prefix = self.prefix
+        lines = []
+
+        def metric(name, kind, samples):
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+        endpoints = summary["endpoints"]
+        metric("run_duration_seconds", "gauge", [({}, summary["duration_seconds"])])
+        metric("stage_seconds", "gauge", [({"stage": name}, stage["seconds"]) for name, stage in summary["stages"].items()])
+        metric("stage_calls", "gauge", [({"stage": name}, stage["calls"]) for name, stage in summary["stages"].items()])
+        metric("requests_total", "counter", [({"endpoint": endpoint, "status": status}, count)
+                                             for endpoint, stats in endpoints.items()
+                                             for status, count in stats["statuses"].items()])
+        metric("request_latency_seconds", "summary",
+               [({"endpoint": endpoint, "quantile": str(quantile)}, stats[f"latency_p{int(quantile * 100)}"])
+                for endpoint, stats in endpoints.items() for quantile in QUANTILES])
+        lines.extend(f'{prefix}_request_latency_seconds_sum{{endpoint="{endpoint}"}} {stats["latency_sum"]}'
+                     for endpoint, stats in endpoints.items())
+        lines.extend(f'{prefix}_request_latency_seconds_count{{endpoint="{endpoint}"}} {stats["requests"]}'
+                     for endpoint, stats in endpoints.items())
+        metric("downloaded_bytes_total", "counter", [({"endpoint": endpoint}, stats["bytes"])
+                                                     for endpoint, stats in endpoints.items()])
+        for name, value in summary["counters"].items():
+            metric(f"{name}_total", "counter", [({}, value)])
+
+        return "\n".join(lines) + "\n"
+
+    def export_json(self, file_path):
+        """
+        Writes the summary to a JSON file and prints the time per stage and the requests per endpoint.
+
+        Returns:
+        - summary (dict): The exported summary.
+        """
+        summary = self.summary()
+        with open(file_path, "w") as file:
+            json.dump(summary, file, indent = 2)
+
+        print(f"Run metrics ({summary['duration_seconds']:.1f} seconds) saved to {file_path}")
+        for name, stage in sorted(summary["stages"].items(), key = lambda item: -item[1]["seconds"]):
+            print(f"  {name}: {stage['seconds']:.2f} s in {stage['calls']} calls")
+        for endpoint, stats in summary["endpoints"].items():
+            print(f"  {endpoint}: {stats['requests']} requests, {stats['requests_per_second']:.2f} req/s, "
+                  f"p50 {stats['latency_p50']:.3f} s, p95 {stats['latency_p95']:.3f} s, p99 {stats['latency_p99']:.3f} s")
+
+        return summary
+
+    def export_prometheus(self, file_path):
+        # Written to a temporary file first, so a scraper never reads a half-written file
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(temp_path, file_path)
+
+
+# Shared collector of the current run, used by the decorated methods of DataFetcher, DataProcessor,
+# FundamentalPipeline and LLMEvaluator
+METRICS = RunMetrics()
@@ -0,0 +1,139 @@
+# prescoring.py
+
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Criterion -> (metric column, value scored 1, value scored 10). Values in between are interpolated linearly and
+# values beyond the anchors are clipped, so "lower is better" metrics simply have a higher 1-anchor.
+SCORING_RULES = {
+    "Financial Health": ("CurrentRatio", 0.8, 2.0),
+    "Valuation": ("PERatio", 40.0, 10.0),
+    "Margin of Safety": ("PEGRatio", 3.0, 1.0),
+    "Profitability": ("NetProfitMargin", 0.0, 0.2),
+    "Dividends": ("DividendYield", 0.0, 0.04),
+    "Debt": ("DebtToEquityRatio", 2.0, 0.3),
+    "Return on Equity": ("ReturnOnEquity", 0.05, 0.2),
+    "Capital Expenditures": ("CapexToOperatingCashflow", 0.8, 0.2),
+    "Undervalued or Overvalued": ("PriceToBookRatio", 5.0, 1.0),
+    "Growth Potential": ("ExpectedEarningsGrowth", 0.8, 1.3),
+}
+# Metrics where a negative value means losses or negative equity and scores 1
+NEGATIVE_IS_WORST = ["PERatio", "PEGRatio", "DebtToEquityRatio", "PriceToBookRatio", "CapexToOperatingCashflow"]
+
+
+class BuffettPreScorer:
+    """
+    Deterministic 1-10 scores of the Buffett criteria of `prompt_engineering.format_response`, computed with
+    vectorized operations over the processed overview, balance sheet and cash flow frames of the whole universe.
+
+    Companies whose composite score is clearly high or clearly low, with enough criteria covered by data, are
+    decided quantitatively; only the companies in the uncertain band are sent to the LLM (see `needs_llm`).
+    """
+    def __init__(self, uncertain_band = (4.0, 7.0), min_coverage = 0.7):
+
+        self.uncertain_band = uncertain_band
+        self.min_coverage = min_coverage
+
+    @staticmethod
+    def _latest(frame, columns):
+        # Latest annual report of every symbol
+        latest = (frame.sort_values(["Symbol", "FiscalDateEnding"])
+                  .drop_duplicates(subset = ["Symbol"], keep = "last"))
+        return latest.set_index("Symbol")[columns]
+
+    def metrics(self, **kwargs):
+        """
+        Collects the metric of every criterion in one table indexed by symbol.
+
+        Args:
+        - df_overview (pandas DataFrame): Output of `DataProcessor.process_fundamental_data_overview_frame`.
+        - df_balance_sheet (pandas DataFrame): Output of `DataProcessor.process_fundamental_data_balance_sheet_frame`.
+        - df_cash_flow (pandas DataFrame): Output of `DataProcessor.process_fundamental_data_cash_flow_frame`.
+
+        Returns:
+        - df_metrics (pandas DataFrame): One row per overview symbol, one column per metric of SCORING_RULES.
+        """
+        df_overview = kwargs.get("df_overview")
+        df_balance_sheet = kwargs.get("df_balance_sheet")
+        df_cash_flow = kwargs.get("df_cash_flow")
+
+        df_metrics = df_overview.set_index("Symbol")[["PERatio", "ForwardPERatio", "PEGRatio", "NetProfitMargin",
+                                                      "DividendYield", "ReturnOnEquity", "PriceToBookRatio"]]
+        df_metrics = df_metrics.loc[~df_metrics.index.duplicated(keep = "last")].copy()
+
+        # Trailing over forward P/E above 1 means analysts expect earnings to grow
+        df_metrics["ExpectedEarningsGrowth"] = (df_metrics["PERatio"]
+                                                / df_metrics.pop("ForwardPERatio").where(lambda pe: pe > 0))
+
+        balance = self._latest(df_balance_sheet, ["CurrentRatio", "DebtToEquityRatio"])
+        df_metrics = df_metrics.join(balance)
+
+        # Capex share of operating cash flow summed over all reports, so one unusual year does not dominate
+        totals = df_cash_flow.assign(CapitalExpenditures = df_cash_flow["CapitalExpenditures"].abs()).groupby("Symbol")[
+            ["CapitalExpenditures", "OperatingCashflow"]].sum(min_count = 1)
+        df_metrics["CapexToOperatingCashflow"] = (totals["CapitalExpenditures"]
+                                                  / totals["OperatingCashflow"].where(totals["OperatingCashflow"] > 0))
+
+        # Zero ratios (e.g. a zero denominator in `safe_divide_columns`) carry no information
+        for column in ["CurrentRatio", "DebtToEquityRatio", "PERatio", "PEGRatio", "PriceToBookRatio"]:
+            df_metrics[column] = df_metrics[column].where(df_metrics[column] != 0)
+
+        return df_metrics.replace([np.inf, -np.inf], np.nan)
+
+    def score(self, **kwargs):
+        """
+        Scores every criterion of SCORING_RULES from 1 to 10 for the whole universe.
+
+        Args:
+        - df_overview, df_balance_sheet, df_cash_flow (pandas DataFrame): See `metrics`.
+
+        Returns:
+        - df_scores (pandas DataFrame): Indexed by symbol, with one score column per criterion (NaN when the
+          metric is missing), Composite (mean of the available scores) and Coverage (share of criteria scored).
+        """
+        df_metrics = self.metrics(**kwargs)
+
+        df_scores = pd.DataFrame(index = df_metrics.index)
+        for criterion, (column, worst, best) in SCORING_RULES.items():
+            values = df_metrics[column].to_numpy(dtype = float)
+            scores = 1 + 9 * np.clip((values - worst) / (best - worst), 0, 1)
+            if column in NEGATIVE_IS_WORST:
+                scores = np.where(values < 0, 1.0, scores)
+            df_scores[criterion] = np.round(scores, 1)
+
+        criteria = list(SCORING_RULES)
+        df_scores["Composite"] = df_scores[criteria].mean(axis = 1)
+        df_scores["Coverage"] = df_scores[criteria].notna().mean(axis = 1)
+
+        return df_scores
+
+    def needs_llm(self, df_scores):
+        """
+        Returns a boolean Series, indexed by symbol, of the companies to send to the LLM: composite score inside
+        the uncertain band, or too few criteria covered by data for a quantitative decision.
+        """
+        low, high = self.uncertain_band
+        composite = df_scores["Composite"]
+        return composite.between(low, high) | (df_scores["Coverage"] < self.min_coverage) | composite.isna()
+
+    @staticmethod
+    def to_response(df_scores, symbol):
+        """
+        Formats the pre-scores of one company like an LLM answer (`prompt_engineering.format_response`),
+        so decided companies go through the same result file and `response_parser` as the LLM ones.
+        """
+        row = df_scores.loc[symbol]
+        scores = [None if pd.isna(row[criterion]) else float(row[criterion]) for criterion in SCORING_RULES]
+
+        data = {
+            "Investment Criteria": list(SCORING_RULES),
+            "Score": scores,
+            "Positive/Negative": [None if score is None else ("Positive" if score > 5.5 else "Negative")
+                                  for score in scores],
+            "Reasoning": [f"Quantitative pre-score from {column}" for column, _, _ in SCORING_RULES.values()],
+        }
+
+        return "data = " + json.dumps(data)
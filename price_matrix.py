@@ -0,0 +1,178 @@
+# price_matrix.py
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+PERIODS_PER_YEAR = {"daily": 252, "weekly": 52, "monthly": 12}
+
+
+class PriceMatrix:
+    """
+    Dense date x symbol representation of stored price history, saved as memory-mapped `.npy` files.
+
+    `build` converts the long-format data of a `PriceStore` period into:
+    - prices.npy: float32 matrix of adjusted close prices (NaN where a symbol has no bar on a date),
+    - volumes.npy: float32 matrix of trading volumes,
+    - dates.npy: datetime64[D] row index, and metadata.json with the symbol column index and period.
+
+    The matrices are opened with mmap_mode="r", so analytics run over column chunks of the universe without
+    loading everything into RAM.
+    """
+    def __init__(self, matrix_dir):
+
+        self.matrix_dir = matrix_dir
+
+        with open(os.path.join(matrix_dir, "metadata.json")) as f:
+            metadata = json.load(f)
+
+        self.period = metadata["period"]
+        self.symbols = metadata["symbols"]
+        self.symbol_index = {symbol: position for position, symbol in enumerate(self.symbols)}
+        self.dates = np.load(os.path.join(matrix_dir, "dates.npy"))
+        self.prices = np.load(os.path.join(matrix_dir, "prices.npy"), mmap_mode = "r")
+        self.volumes = np.load(os.path.join(matrix_dir, "volumes.npy"), mmap_mode = "r")
+
+    @staticmethod
+    def build(**kwargs):
+        """
+        Builds the memory-mapped matrices of one period from a price store, chunk of symbols by chunk of symbols.
+
+        Args:
+        - price_store (PriceStore): Store to read the price history from.
+        - period (str): "daily", "weekly" or "monthly".
+        - matrix_dir (str): Output directory.
+        - symbols_list (list of str, optional): Symbols to include. Default is every stored symbol.
+        - chunk_size (int): Number of symbols read from the store at a time. Default is 500.
+
+        Returns:
+        - price_matrix (PriceMatrix): The built matrix, opened read-only.
+        """
+        price_store = kwargs.get("price_store")
+        period = kwargs.get("period")
+        matrix_dir = kwargs.get("matrix_dir")
+        symbols_list = kwargs.get("symbols_list")
+        chunk_size = kwargs.get("chunk_size", 500)
+
+        os.makedirs(matrix_dir, exist_ok = True)
+
+        # The matrix is sized without loading the history at once: symbols come from the latest-bar table
+        # (one row per symbol), and dates from a scan of the trading_date column chunk by chunk
+        df_latest = price_store.load_latest(period = period, symbols_list = symbols_list)
+        symbols = sorted(df_latest["company"].astype(str).unique())
+        del df_latest
+
+        dates = np.array([], dtype = "datetime64[D]")
+        for start in range(0, len(symbols), chunk_size):
+            df_dates = price_store.load(period = period, symbols_list = symbols[start:start + chunk_size],
+                                        columns = ["trading_date"])
+            dates = np.union1d(dates, df_dates["trading_date"].to_numpy().astype("datetime64[D]"))
+
+        prices = np.lib.format.open_memmap(os.path.join(matrix_dir, "prices.npy"), mode = "w+",
+                                           dtype = np.float32, shape = (len(dates), len(symbols)))
+        volumes = np.lib.format.open_memmap(os.path.join(matrix_dir, "volumes.npy"), mode = "w+",
+                                            dtype = np.float32, shape = (len(dates), len(symbols)))
+
+        for start in range(0, len(symbols), chunk_size):
+            chunk = symbols[start:start + chunk_size]
+            df_chunk = price_store.load(period = period, symbols_list = chunk)
+
+            rows = np.searchsorted(dates, df_chunk["trading_date"].to_numpy().astype("datetime64[D]"))
+            columns = start + pd.Index(chunk).get_indexer(df_chunk["company"].astype(str))
+
+            block_prices = np.full((len(dates), len(chunk)), np.nan, dtype = np.float32)
+            block_volumes = np.full((len(dates), len(chunk)), np.nan, dtype = np.float32)
+            block_prices[rows, columns - start] = df_chunk["stock_price_close"].to_numpy(dtype = np.float32)
+            block_volumes[rows, columns - start] = df_chunk["trading_volume"].to_numpy(dtype = np.float32)
+
+            prices[:, start:start + len(chunk)] = block_prices
+            volumes[:, start:start + len(chunk)] = block_volumes
+
+        prices.flush()
+        volumes.flush()
+        del prices, volumes
+
+        np.save(os.path.join(matrix_dir, "dates.npy"), dates)
+        with open(os.path.join(matrix_dir, "metadata.json"), "w") as f:
+            json.dump({"period": period, "symbols": symbols}, f)
+
+        print(f"Price matrix of {len(dates)} dates x {len(symbols)} symbols saved to {matrix_dir}")
+
+        return PriceMatrix(matrix_dir)
+
+    def column(self, symbol):
+        # Price history of one symbol as a Series indexed by date
+        return pd.Series(self.prices[:, self.symbol_index[symbol]], index = pd.to_datetime(self.dates), name = symbol)
+
+    @staticmethod
+    def returns(prices):
+        """
+        Simple period returns of a date x symbol price block. Missing bars are forward filled first,
+        so a gap does not split a return; the first row is NaN.
+        """
+        prices = pd.DataFrame(prices).ffill().to_numpy()
+        block_returns = np.full(prices.shape, np.nan, dtype = np.float32)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            block_returns[1:] = prices[1:] / prices[:-1] - 1
+        return block_returns
+
+    @staticmethod
+    def max_drawdown(prices):
+        """
+        Maximum drawdown (as a negative fraction) of every column of a date x symbol price block.
+        """
+        prices = pd.DataFrame(prices).ffill().to_numpy()
+        running_max = np.fmax.accumulate(prices, axis = 0)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            drawdowns = prices / running_max - 1
+        return np.nanmin(np.where(np.isnan(drawdowns), 0, drawdowns), axis = 0)
+
+    def universe_stats(self, **kwargs):
+        """
+        Computes return, volatility and drawdown statistics for every symbol, chunk of columns by chunk of columns.
+
+        Args:
+        - start_date (str or datetime, optional): First date of the window. Default is the first stored date.
+        - end_date (str or datetime, optional): Last date of the window. Default is the last stored date.
+        - chunk_size (int): Number of symbols processed at a time. Default is 1000.
+
+        Returns:
+        - df_stats (pandas DataFrame): One row per symbol with last_price, total_return, annualized_volatility,
+          max_drawdown and average_volume.
+        """
+        start_date = kwargs.get("start_date")
+        end_date = kwargs.get("end_date")
+        chunk_size = kwargs.get("chunk_size", 1000)
+
+        first_row = 0 if start_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date).date()))
+        last_row = len(self.dates) if end_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date).date()), side = "right")
+        annualization = np.sqrt(PERIODS_PER_YEAR[self.period])
+
+        stats = {name: np.full(len(self.symbols), np.nan) for name in
+                 ["last_price", "total_return", "annualized_volatility", "max_drawdown", "average_volume"]}
+
+        for start in range(0, len(self.symbols), chunk_size):
+            stop = min(start + chunk_size, len(self.symbols))
+            block_prices = np.asarray(self.prices[first_row:last_row, start:stop], dtype = np.float64)
+            block_volumes = np.asarray(self.volumes[first_row:last_row, start:stop], dtype = np.float64)
+
+            if block_prices.shape[0] == 0:
+                continue
+
+            filled = pd.DataFrame(block_prices).ffill().bfill().to_numpy()
+            block_returns = self.returns(block_prices)
+
+            with np.errstate(divide = "ignore", invalid = "ignore"):
+                stats["last_price"][start:stop] = filled[-1]
+                stats["total_return"][start:stop] = filled[-1] / filled[0] - 1
+                stats["annualized_volatility"][start:stop] = np.nanstd(block_returns, axis = 0, ddof = 1) * annualization
+                stats["max_drawdown"][start:stop] = self.max_drawdown(block_prices)
+                stats["average_volume"][start:stop] = np.nanmean(block_volumes, axis = 0)
+
+        df_stats = pd.DataFrame(stats)
+        df_stats.insert(0, "company", self.symbols)
+
+        return df_stats
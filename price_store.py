@@ -0,0 +1,203 @@
+# price_store.py
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+PRICE_SCHEMA = pa.schema([
+    ("stock_price_close", pa.float32()),
+    ("trading_volume", pa.int64()),
+    ("trading_date", pa.timestamp("us")),
+    ("company", pa.string()),
+])
+# pyarrow's default limit of partitions (and open files) per write_to_dataset call
+MAX_PARTITIONS_PER_WRITE = 1024
+
+
+class PriceStore:
+    """
+    Columnar Parquet store for stock price and volume history.
+
+    Data is written as a hive-partitioned dataset `{root}/period={period}/company={symbol}/`, with typed columns
+    (float32 close, int64 volume, timestamp trading date). `load` pushes symbol and date filters and the column
+    selection down to the Parquet reader, so a run only reads the partitions and columns it needs.
+
+    Next to the dataset, a small `latest_{period}.parquet` table holding the last bar of every symbol is kept
+    up to date on every write, so the latest snapshot of the universe can be read without scanning the history.
+    """
+    def __init__(self, root_path):
+
+        self.root_path = root_path
+        os.makedirs(root_path, exist_ok = True)
+
+    def _period_path(self, period):
+        return os.path.join(self.root_path, f"period={period}")
+
+    def _latest_path(self, period):
+        return os.path.join(self.root_path, f"latest_{period}.parquet")
+
+    @staticmethod
+    def _last_bars(df_stocks):
+        # Last bar of every symbol via one sort and drop_duplicates, no per-group Python callback
+        return (df_stocks.sort_values(["company", "trading_date"])
+                .drop_duplicates(subset = ["company"], keep = "last")
+                .reset_index(drop = True))
+
+    @staticmethod
+    def _empty_frame(columns = None):
+        df_stocks = pd.DataFrame({field.name: pd.Series(dtype = field.type.to_pandas_dtype()) for field in PRICE_SCHEMA})
+        df_stocks["company"] = df_stocks["company"].astype("category")
+        if columns is not None:
+            df_stocks = df_stocks.loc[:, columns]
+        return df_stocks
+
+    def _dataset(self, period):
+        return ds.dataset(self._period_path(period), format = "parquet", partitioning = "hive")
+
+    def has_period(self, period):
+        period_path = self._period_path(period)
+        return os.path.isdir(period_path) and len(os.listdir(period_path)) > 0
+
+    def write(self, df_stocks, period):
+        """
+        Writes price data for one period. Every symbol present in df_stocks replaces its stored partition,
+        other symbols are left untouched.
+
+        Args:
+        - df_stocks (pandas DataFrame): Columns stock_price_close, trading_volume, trading_date and company.
+        - period (str): "daily", "weekly" or "monthly".
+        """
+        if df_stocks.empty:
+            return
+
+        df_stocks = df_stocks.loc[:, ["stock_price_close", "trading_volume", "trading_date", "company"]].copy()
+        df_stocks["company"] = df_stocks["company"].astype(str)
+        df_stocks["trading_date"] = pd.to_datetime(df_stocks["trading_date"]).astype("datetime64[us]")
+        df_stocks = df_stocks.sort_values("company", kind = "stable").reset_index(drop = True)
+
+        # One write per chunk of at most MAX_PARTITIONS_PER_WRITE symbols, so a universe-scale write stays
+        # within pyarrow's partition limit. Rows are sorted by symbol, so every chunk is a contiguous slice.
+        companies = df_stocks["company"].unique()
+        starts = np.searchsorted(df_stocks["company"].to_numpy(), companies[::MAX_PARTITIONS_PER_WRITE])
+        ends = list(starts[1:]) + [len(df_stocks)]
+        for start, end in zip(starts, ends):
+            table = pa.Table.from_pandas(df_stocks.iloc[start:end], schema = PRICE_SCHEMA, preserve_index = False)
+            pq.write_to_dataset(table, self._period_path(period), partition_cols = ["company"],
+                                existing_data_behavior = "delete_matching")
+
+        self._update_latest(df_stocks, period)
+
+    def _update_latest(self, df_stocks, period):
+        # Written symbols replace their whole history, so their last bar comes from df_stocks alone
+        df_latest = self._last_bars(df_stocks)
+
+        latest_path = self._latest_path(period)
+        if os.path.exists(latest_path):
+            df_stored = pd.read_parquet(latest_path)
+            df_stored = df_stored.loc[~df_stored["company"].isin(df_latest["company"])]
+            df_latest = pd.concat([df_stored, df_latest], ignore_index = True)
+
+        df_latest = df_latest.sort_values("company").reset_index(drop = True)
+        table = pa.Table.from_pandas(df_latest, schema = PRICE_SCHEMA, preserve_index = False)
+        pq.write_table(table, latest_path)
+
+    def load_latest(self, **kwargs):
+        """
+        Loads the last stored bar of every symbol of a period from the latest-bar table.
+        The table is rebuilt from the dataset if it does not exist yet.
+
+        Args:
+        - period (str): "daily", "weekly" or "monthly".
+        - symbols_list (list of str, optional): Symbols to load. Default is all stored symbols.
+
+        Returns:
+        - df_latest (pandas DataFrame): One typed row per symbol with a categorical company column.
+        """
+        period = kwargs.get("period")
+        symbols_list = kwargs.get("symbols_list")
+
+        if not self.has_period(period) or (symbols_list is not None and len(symbols_list) == 0):
+            return self._empty_frame()
+
+        latest_path = self._latest_path(period)
+        if not os.path.exists(latest_path):
+            print(f"Latest-bar table for {period} data not found. Building it from the price store...")
+            self._update_latest(self.load(period = period), period)
+
+        filters = None
+        if symbols_list is not None:
+            filters = [("company", "in", list(symbols_list))]
+
+        df_latest = pd.read_parquet(latest_path, filters = filters)
+        df_latest["company"] = df_latest["company"].astype(str).astype("category")
+
+        return df_latest
+
+    def load(self, **kwargs):
+        """
+        Loads price data for one period, reading only the requested symbols, dates and columns.
+
+        Args:
+        - period (str): "daily", "weekly" or "monthly".
+        - symbols_list (list of str, optional): Symbols to load. Default is all stored symbols.
+        - start_date (str or datetime, optional): First trading date to load.
+        - end_date (str or datetime, optional): Last trading date to load.
+        - columns (list of str, optional): Columns to load. The company column is always included.
+
+        Returns:
+        - df_stocks (pandas DataFrame): Typed price data with a categorical company column.
+        """
+        period = kwargs.get("period")
+        symbols_list = kwargs.get("symbols_list")
+        start_date = kwargs.get("start_date")
+        end_date = kwargs.get("end_date")
+        columns = kwargs.get("columns")
+
+        if columns is not None:
+            columns = list(dict.fromkeys(list(columns) + ["company"]))
+
+        # An empty symbols_list cannot be pushed down as an "isin" filter, and selects nothing anyway
+        if not self.has_period(period) or (symbols_list is not None and len(symbols_list) == 0):
+            return self._empty_frame(columns)
+
+        expression = None
+        filters = []
+        if symbols_list is not None:
+            filters.append(ds.field("company").isin(list(symbols_list)))
+        if start_date is not None:
+            filters.append(ds.field("trading_date") >= pd.Timestamp(start_date).to_datetime64())
+        if end_date is not None:
+            filters.append(ds.field("trading_date") <= pd.Timestamp(end_date).to_datetime64())
+        for condition in filters:
+            expression = condition if expression is None else expression & condition
+
+        table = self._dataset(period).to_table(columns = columns, filter = expression)
+        df_stocks = table.to_pandas()
+        df_stocks["company"] = df_stocks["company"].astype(str).astype("category")
+
+        return df_stocks
+
+    def last_trading_dates(self, period):
+        """
+        Returns the last stored trading date of every symbol of a period as a Series indexed by symbol.
+        """
+        df_latest = self.load_latest(period = period)
+        return df_latest.set_index(df_latest["company"].astype(str))["trading_date"]
+
+    def migrate_csv(self, csv_path, period):
+        """
+        Imports a legacy price CSV cache (as written by `DataFetcher.fetch_latest_stock_price_vol`) into the store.
+        """
+        print(f"Migrating {csv_path} to the Parquet price store...")
+        df_stocks = pd.read_csv(csv_path,
+                                usecols = ["stock_price_close", "trading_volume", "trading_date", "company"],
+                                dtype = {"stock_price_close": np.float32, "trading_volume": np.float64, "company": str},
+                                parse_dates = ["trading_date"])
+        df_stocks["trading_volume"] = df_stocks["trading_volume"].fillna(0).astype(np.int64)
+        self.write(df_stocks, period)
+        print(f"Migrated {len(df_stocks)} rows for {df_stocks['company'].nunique()} symbols.")
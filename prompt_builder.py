@@ -0,0 +1,129 @@
+# prompt_builder.py
+
+from metrics import METRICS
+from prompt_engineering import (
+    prompt_task,
+    prompt_task_support,
+    type_response_batch,
+    format_response_batch,
+)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+_encoding = None
+
+
+def count_tokens(text, model = "gpt-4"):
+    # Counts tokens with tiktoken when it is installed, otherwise estimates ~4 characters per token
+    global _encoding
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model(model)
+    return len(_encoding.encode(text))
+
+
+def format_value(value, float_digits = 3):
+    # Large amounts are rounded to whole numbers, ratios and margins to `float_digits` decimals
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        if abs(value) >= 100:
+            return str(int(round(value)))
+        value = round(value, float_digits)
+        return str(int(value)) if value == int(value) else str(value)
+    return "" if value is None else str(value)
+
+
+def serialize_records(records, columns = None, float_digits = 3, drop_columns = ("Symbol",)):
+    """
+    Serializes a list of records into a compact table: one `|`-separated header row and one row per record.
+
+    Args:
+    - records (list of dict): Records of one company, e.g. from `DataFetcher.fetch_company_data_by_key`.
+    - columns (list of str, optional): Columns to emit, in order. Default is every key in order of appearance.
+    - float_digits (int): Decimals kept for floats below 100.
+    - drop_columns (tuple of str): Columns left out because they repeat on every row.
+
+    Returns:
+    - table (str): The serialized table, or an empty string if there are no records.
+    """
+    if not records:
+        return ""
+
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    columns = [column for column in columns if column not in drop_columns]
+
+    lines = ["|".join(columns)]
+    lines.extend("|".join(format_value(record.get(column), float_digits) for column in columns) for record in records)
+
+    return "\n".join(lines)
+
+
+@METRICS.timed("prompt.build_company_context")
+def build_company_context(**kwargs):
+    """
+    Builds the compact financial context of one company for the LLM prompt.
+
+    Every source becomes a titled table (see `serialize_records`). Sources with a `FiscalDateEnding`
+    column are sorted newest first, and while the context is over `max_tokens` the oldest period across
+    all of them is dropped. Sources without periods (e.g. the overview) are never trimmed.
+
+    Args:
+    - sections (dict): Maps a section title (e.g. "Income statement") to the list of records of the company.
+    - max_tokens (int, optional): Token budget of the context. Default is 1500. None disables trimming.
+    - float_digits (int): Decimals kept for floats below 100. Default is 3.
+
+    Returns:
+    - context (str): The serialized context.
+    """
+    sections = kwargs.get("sections")
+    max_tokens = kwargs.get("max_tokens", 1500)
+    float_digits = kwargs.get("float_digits", 3)
+
+    date_key = "FiscalDateEnding"
+    sections = {title: sorted(records, key = lambda record: record.get(date_key, ""), reverse = True)
+                if any(date_key in record for record in records) else list(records)
+                for title, records in sections.items()}
+
+    def render():
+        return "\n\n".join(f"{title}:\n{serialize_records(records, float_digits = float_digits)}"
+                           for title, records in sections.items() if records)
+
+    context = render()
+
+    while max_tokens is not None and count_tokens(context) > max_tokens:
+        periods = {record[date_key] for records in sections.values() for record in records if date_key in record}
+        if len(periods) <= 1:
+            break
+
+        oldest_period = min(periods)
+        sections = {title: [record for record in records if record.get(date_key) != oldest_period]
+                    for title, records in sections.items()}
+        context = render()
+
+    return context
+
+
+def build_batch_prompt(**kwargs):
+    """
+    Builds one prompt asking for the evaluation of several companies, answered as JSON keyed by symbol.
+
+    Args:
+    - contexts (dict): Maps each company symbol to its context from `build_company_context`, in batch order.
+
+    Returns:
+    - prompt (str): The batch prompt.
+    """
+    contexts = kwargs.get("contexts")
+
+    symbols = ", ".join(contexts)
+    question = f"{prompt_task} {symbols}, {prompt_task_support}. All companies' {type_response_batch}: {format_response_batch}"
+    companies = "\n\n".join(f"### {symbol}\n{context}" for symbol, context in contexts.items())
+
+    return question + "\n" + companies
@@ -19,4 +19,22 @@ format_response = """
                 }
 """
 
-llm_model = "gpt-4"
\ No newline at end of file
+type_response_batch = """
+                fiancial resultas of every company are provided at the end of this message, each under a header with its symbol. For each company and each category, provide Score from 1-10 (1=negative, 10=positive), indicate if the category is positive or negative, and explain your reasoning. Respond with a single JSON object keyed by company symbol, where each value uses the labels 'Investment Criteria', 'Score', 'Positive/Negative', and 'Reasoning' exactly as in the following format
+"""
+
+format_response_batch = """
+                {
+                "SYMBOL": {
+                    "Investment Criteria": ["Financial Health", "Valuation", "Margin of Safety", "Profitability", "Dividends", "Debt", "Return on Equity", "Capital Expenditures", "Undervalued or Overvalued", "Growth Potential"],
+                    "Score": [Score for each criteria],
+                    "Positive/Negative": [Evaluation for each criteria],
+                    "Reasoning": [Reasoning for each score]
+                    }
+                }
+"""
+
+llm_model = "gpt-4"
+
+# Bump whenever the prompt texts above change, so cached LLM responses are not reused for a different prompt
+prompt_version = "2"
\ No newline at end of file
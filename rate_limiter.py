@@ -0,0 +1,110 @@
+# rate_limiter.py
+
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that caps how many API requests are sent per minute.
+
+    Tokens are refilled continuously at `requests_per_minute / 60` tokens per second up to `burst`.
+    Every request takes one token; callers block in `acquire` until a token is available, so any number
+    of worker threads sharing one bucket together never exceed the configured rate.
+    """
+    def __init__(self, requests_per_minute, burst = 1):
+
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be greater than 0")
+
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, tokens = 1):
+        """
+        Blocks until `tokens` tokens are available and takes them from the bucket.
+        Requests larger than the bucket capacity wait for a full bucket.
+        """
+        tokens = min(tokens, self.burst)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_time = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+    def set_rate(self, requests_per_minute):
+        """
+        Changes the refill rate. Tokens accumulated at the old rate are kept.
+        """
+        with self.lock:
+            self._refill()
+            self.requests_per_minute = requests_per_minute
+            self.rate = requests_per_minute / 60.0
+
+
+class AdaptiveRateController:
+    """
+    AIMD (additive increase, multiplicative decrease) control of a `TokenBucket` rate.
+
+    Every throttled response multiplies the rate by `decrease_factor` (at most once per `cooldown` seconds, so
+    the requests already in flight when the API starts throttling cut the rate only once), and every
+    `increase_every` good responses add `additive_increase` requests per minute, up to `max_requests_per_minute`.
+    The rate therefore settles just under the highest rate the API accepts.
+    """
+    def __init__(self, bucket, min_requests_per_minute = 5, max_requests_per_minute = None,
+                 additive_increase = 1.0, decrease_factor = 0.5, increase_every = 10, cooldown = 10.0):
+
+        self.bucket = bucket
+        self.min_requests_per_minute = min_requests_per_minute
+        self.max_requests_per_minute = max_requests_per_minute or bucket.requests_per_minute
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.increase_every = increase_every
+        self.cooldown = cooldown
+        self.successes = 0
+        self.last_decrease = float("-inf")
+        self.lock = threading.Lock()
+
+    def on_success(self):
+        with self.lock:
+            self.successes += 1
+            if self.successes < self.increase_every:
+                return
+            self.successes = 0
+            requests_per_minute = min(self.max_requests_per_minute, self.bucket.requests_per_minute + self.additive_increase)
+            if requests_per_minute != self.bucket.requests_per_minute:
+                self.bucket.set_rate(requests_per_minute)
+
+    def on_throttle(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.successes = 0
+            requests_per_minute = max(self.min_requests_per_minute, self.bucket.requests_per_minute * self.decrease_factor)
+            self.bucket.set_rate(requests_per_minute)
+        print(f"Throttled by the API. Lowering the request rate to {requests_per_minute:.1f} requests per minute.")
+
+
+def backoff_delay(attempt, base_delay = 1.0, max_delay = 60.0):
+    """
+    Returns the exponential backoff delay in seconds for a zero-based retry attempt.
+    Half of the delay is randomised so that workers retrying at the same time spread out.
+    """
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
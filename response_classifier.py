@@ -0,0 +1,55 @@
+# response_classifier.py
+
+
+OK = "ok"
+EMPTY = "empty"
+THROTTLED = "throttled"
+ERROR = "error"
+FAILED = "failed"
+
+# Alpha Vantage answers throttled and rejected calls with HTTP 200 and one of these keys instead of data
+THROTTLE_KEYS = ("Note", "Information")
+ERROR_KEYS = ("Error Message",)
+# Per-minute and per-day limit messages. Both also link to the premium plans page, so the mere word "premium"
+# does not make a message non-retryable
+THROTTLE_MARKERS = ("call frequency", "rate limit", "requests per day", "requests per minute", "spreading out")
+# "Information" also announces premium-only endpoints, which no amount of waiting fixes
+NON_RETRYABLE_MARKERS = ("premium endpoint",)
+
+
+def classify_response(json_data, data_key = None):
+    """
+    Classifies a decoded Alpha Vantage response.
+
+    Args:
+    - json_data (dict): Decoded response.
+    - data_key (str, optional): Key a good response must contain, e.g. "Time Series (Daily)".
+
+    Returns:
+    - status (str): OK for data, EMPTY for an empty object (e.g. OVERVIEW of an unknown symbol),
+      THROTTLED for a call frequency / rate limit message, ERROR for an error message or a response
+      without data_key.
+    """
+    if not isinstance(json_data, dict):
+        return ERROR
+
+    if data_key is not None and data_key in json_data:
+        return OK
+
+    for key in ERROR_KEYS:
+        if key in json_data:
+            return ERROR
+
+    for key in THROTTLE_KEYS:
+        if key in json_data and len(json_data) <= 2:
+            message = str(json_data[key]).lower()
+            if any(marker in message for marker in THROTTLE_MARKERS):
+                return THROTTLED
+            if any(marker in message for marker in NON_RETRYABLE_MARKERS):
+                return ERROR
+            return THROTTLED
+
+    if data_key is not None:
+        return ERROR
+
+    return OK if json_data else EMPTY
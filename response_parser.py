@@ -0,0 +1,161 @@
+# response_parser.py
+
+import json
+import re
+
+import pandas as pd
+
+
+SCHEMA_COLUMNS = ["Investment Criteria", "Score", "Positive/Negative", "Reasoning"]
+MISSING_VALUES = {"None", "NA", "N/A", "n/a", ""}
+
+# Payload after the `data = ` marker requested in `prompt_engineering.format_response`, else the outermost braces
+_payload_pattern = re.compile(r"data\s*=\s*(\{.*\})|(\{.*\})", re.DOTALL)
+
+# One alternation scanned left to right, so quoted strings are consumed whole before anything inside them is touched
+_repair_pattern = re.compile(
+    r'(?P<double>"(?:[^"\\]|\\.)*")'
+    r"|(?P<single>'(?:[^'\\]|\\.)*')"
+    r"|(?P<fprefix>\bf(?=[\"']))"
+    r"|(?P<literal>\b(?:None|True|False|NaN)\b)"
+    r"|(?P<trailing>,\s*(?=[}\]]))"
+)
+_literals = {"None": "null", "True": "true", "False": "false", "NaN": "null"}
+
+
+def _repair_match(match):
+    kind = match.lastgroup
+    if kind == "double":
+        return match.group(0)
+    if kind == "single":
+        return json.dumps(match.group(0)[1:-1].replace("\\'", "'"))
+    if kind == "literal":
+        return _literals[match.group(0)]
+    return ""
+
+
+def repair_json(text):
+    """
+    Repairs the usual quoting issues of LLM answers in one pass: single-quoted strings, Python None/True/False,
+    f-string prefixes and trailing commas. Text already inside double quotes is left untouched.
+    """
+    return _repair_pattern.sub(_repair_match, text)
+
+
+def extract_payload(text):
+    # Returns the JSON-like object of an answer, or None when there is none
+    match = _payload_pattern.search(text or "")
+    if match is None:
+        return None
+    return match.group(1) or match.group(2)
+
+
+def _clean_value(value):
+    if isinstance(value, str) and value.strip() in MISSING_VALUES:
+        return None
+    return value
+
+
+def _to_score(value):
+    value = _clean_value(value)
+    if value is None:
+        return None
+    score = float(value)
+    if not 0 <= score <= 10:
+        raise ValueError(f"score {score} outside 0-10")
+    return score
+
+
+def parse_response(text):
+    """
+    Parses one LLM answer into its evaluation table.
+
+    Args:
+    - text (str): Answer text in the `prompt_engineering.format_response` format.
+
+    Returns:
+    - columns (dict): Maps each of SCHEMA_COLUMNS to a list of equal length.
+
+    Raises:
+    - ValueError: If the answer has no payload, does not parse, or does not match the schema.
+    """
+    payload = extract_payload(text)
+    if payload is None:
+        raise ValueError("no data payload")
+
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        data = json.loads(repair_json(payload))
+
+    if not isinstance(data, dict):
+        raise ValueError("payload is not an object")
+
+    missing = [column for column in SCHEMA_COLUMNS if not isinstance(data.get(column), list)]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+
+    lengths = {len(data[column]) for column in SCHEMA_COLUMNS}
+    if len(lengths) != 1:
+        raise ValueError("columns have different lengths")
+
+    return {
+        "Investment Criteria": [_clean_value(value) for value in data["Investment Criteria"]],
+        "Score": [_to_score(value) for value in data["Score"]],
+        "Positive/Negative": [_clean_value(value) for value in data["Positive/Negative"]],
+        "Reasoning": [_clean_value(value) for value in data["Reasoning"]],
+    }
+
+
+def parse_responses(**kwargs):
+    """
+    Parses the LLM answers of many companies into one scores table.
+
+    Rows are collected into plain column lists and the DataFrame is built once at the end.
+
+    Args:
+    - responses (iterable): (company, text) pairs, e.g. the rows of `final_response.csv`.
+    - verbose (bool): Print the parse report. Default is True.
+
+    Returns:
+    - df_scores (pandas DataFrame): One row per company and criterion, with a `company` column.
+    - report (dict): Number of responses, parsed and failed responses, failure rate and failures by reason.
+    """
+    responses = kwargs.get("responses")
+    verbose = kwargs.get("verbose", True)
+
+    columns = {column: [] for column in SCHEMA_COLUMNS + ["company"]}
+    failures = {}
+    total = 0
+
+    for company, text in responses:
+        total += 1
+        try:
+            parsed = parse_response(text)
+        except (ValueError, TypeError) as e:
+            reason = str(e).split(":")[0]
+            failures[reason] = failures.get(reason, 0) + 1
+            continue
+
+        for column in SCHEMA_COLUMNS:
+            columns[column].extend(parsed[column])
+        columns["company"].extend([company] * len(parsed["Score"]))
+
+    failed = sum(failures.values())
+    report = {
+        "responses": total,
+        "parsed": total - failed,
+        "failed": failed,
+        "failure_rate": failed / total if total else 0,
+        "failures_by_reason": failures,
+    }
+
+    if verbose:
+        print(f"Parsed {report['parsed']} of {total} responses ({report['failure_rate']:.1%} failed)")
+        for reason, count in failures.items():
+            print(f"  {reason}: {count}")
+
+    df_scores = pd.DataFrame(columns)
+    df_scores["Score"] = df_scores["Score"].astype(float)
+
+    return df_scores, report
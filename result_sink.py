@@ -0,0 +1,104 @@
+# result_sink.py
+
+import csv
+import io
+import os
+import threading
+
+
+class ResultSink:
+    """
+    Append-only CSV writer for LLM evaluation results, one `company,response` row per completed company.
+
+    Rows are appended and flushed as they arrive instead of rewriting the whole file, and the file is
+    fsynced every `fsync_every` rows and on close. Writes are serialized with a lock, so several producer
+    threads can share one sink. Symbols that already have a row are available through `completed_symbols`,
+    which lets an interrupted run skip companies that were scored before.
+    """
+    def __init__(self, file_path, fsync_every = 10):
+
+        self.file_path = file_path
+        self.fsync_every = fsync_every
+        self.lock = threading.Lock()
+        self.pending = 0
+
+        self._repair()
+        self.completed = {row[0] for row in self._read_rows()}
+        self.file = open(self.file_path, "a", newline = "", encoding = "utf-8")
+        self.writer = csv.writer(self.file)
+
+    def _read_rows(self):
+        if not os.path.exists(self.file_path):
+            return []
+        with open(self.file_path, newline = "", encoding = "utf-8") as f:
+            return [row for row in csv.reader(f) if row]
+
+    def _repair(self):
+        # A run killed in the middle of a write leaves a torn last row; drop it. Responses span several lines,
+        # so a row only counts as complete when the reader closed all its quoted fields and a line terminator
+        # follows (embedded newlines are inside quotes and never end a row). Both the writer's "\r\n" and the
+        # "\n" of files written by the former `df.to_csv` count as terminators.
+        if not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0:
+            return
+
+        # A write cut inside a multi-byte character must not stop the file from being read
+        with open(self.file_path, newline = "", encoding = "utf-8", errors = "surrogateescape") as f:
+            text = f.read()
+
+        consumed = [0, ""]
+
+        def lines():
+            for line in io.StringIO(text, newline = ""):
+                consumed[0] += len(line)
+                consumed[1] = line
+                yield line
+
+        complete_length = 0
+        try:
+            for row in csv.reader(lines(), strict = True):
+                if not consumed[1].endswith(("\n", "\r")):
+                    break
+                complete_length = consumed[0]
+        except csv.Error:
+            pass
+
+        if complete_length == len(text):
+            return
+
+        print(f"Incomplete last row found in {self.file_path}. Removing it...")
+        temp_file_path = self.file_path + ".tmp"
+        with open(temp_file_path, "w", newline = "", encoding = "utf-8", errors = "surrogateescape") as f:
+            f.write(text[:complete_length])
+        os.replace(temp_file_path, self.file_path)
+
+    def completed_symbols(self):
+        with self.lock:
+            return set(self.completed)
+
+    def write(self, company_symbol, content):
+        """
+        Appends the result of one company and flushes it to the file.
+        """
+        with self.lock:
+            self.writer.writerow([company_symbol, content])
+            self.file.flush()
+            self.completed.add(company_symbol)
+            self.pending += 1
+
+            if self.pending >= self.fsync_every:
+                os.fsync(self.file.fileno())
+                self.pending = 0
+
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,195 @@
+# screening.py
+
+import pandas as pd
+
+
+class UniverseScreener:
+    """
+    Declarative screening of the stock universe, applied on cheap data before the expensive stages.
+
+    The criteria are a plain dict; every key is optional:
+    - symbols (list of str): Only keep these symbols.
+    - min_stock_price, max_stock_price, min_volume, min_dollar_volume: Applied to the latest price bar
+      (see `DataFetcher.fetch_latest_stock_price_vol`).
+    - min_market_cap, max_market_cap, sectors, exclude_sectors, min_pe, max_pe: Applied to the processed
+      OVERVIEW data (see `DataProcessor.process_fundamental_data_overview_frame`).
+    - min_revenue_cagr, min_net_income_cagr, max_gross_margin_std, min_free_cash_flow_positive_share: Applied to
+      the multi-year trend features (see `DataProcessor.process_trend_features_frame`).
+
+    The symbols criterion is applied to the listing before the prices are fetched (see `screen_symbols`).
+    Only the symbols passing the price screen get their OVERVIEW fetched, only those passing the overview
+    screen get their statements fetched, and only those passing the trend screen are sent to the LLM.
+    """
+    price_criteria = ["min_stock_price", "max_stock_price", "min_volume", "min_dollar_volume"]
+    trend_criteria = ["min_revenue_cagr", "min_net_income_cagr", "max_gross_margin_std",
+                      "min_free_cash_flow_positive_share"]
+
+    def __init__(self, criteria):
+
+        self.criteria = criteria
+
+    def price_filters(self):
+        # Price criteria as keyword arguments of `DataFetcher.fetch_latest_stock_price_vol`
+        return {key: self.criteria[key] for key in self.price_criteria if key in self.criteria}
+
+    def screen_symbols(self, **kwargs):
+        """
+        Applies the symbols criterion to a list of symbols, before any data is fetched for them.
+
+        Args:
+        - symbols_list (list of str): Symbols to screen, e.g. the listed stocks.
+
+        Returns:
+        - symbols_list (list of str): Symbols passing the screen, in their original order.
+        """
+        symbols_list = list(kwargs.get("symbols_list"))
+
+        if "symbols" not in self.criteria:
+            return symbols_list
+
+        symbols = set(self.criteria["symbols"])
+        screened = [symbol for symbol in symbols_list if symbol in symbols]
+        print(f"Symbol screen: {len(screened)} of {len(symbols_list)} symbols passed.")
+
+        return screened
+
+    def screen_prices(self, **kwargs):
+        """
+        Applies the symbol and price criteria to the latest price bars.
+
+        Args:
+        - df_stocks_price (pandas DataFrame): Latest bar per symbol with columns company, stock_price_close
+          and trading_volume.
+
+        Returns:
+        - symbols_list (list of str): Symbols passing the screen.
+        """
+        df_stocks_price = kwargs.get("df_stocks_price")
+
+        close = df_stocks_price["stock_price_close"].astype(float)
+        volume = df_stocks_price["trading_volume"].astype(float)
+        mask = pd.Series(True, index = df_stocks_price.index)
+
+        if "symbols" in self.criteria:
+            mask &= df_stocks_price["company"].isin(self.criteria["symbols"])
+        if "min_stock_price" in self.criteria:
+            mask &= close > self.criteria["min_stock_price"]
+        if "max_stock_price" in self.criteria:
+            mask &= close < self.criteria["max_stock_price"]
+        if "min_volume" in self.criteria:
+            mask &= volume > self.criteria["min_volume"]
+        if "min_dollar_volume" in self.criteria:
+            mask &= close * volume >= self.criteria["min_dollar_volume"]
+
+        symbols_list = df_stocks_price.loc[mask, "company"].astype(str).tolist()
+        print(f"Price screen: {len(symbols_list)} of {len(df_stocks_price)} symbols passed.")
+
+        return symbols_list
+
+    def screen_overview(self, **kwargs):
+        """
+        Applies the market cap, sector and P/E criteria to the processed OVERVIEW data.
+        Symbols with a missing value for a criterion do not pass it.
+
+        Args:
+        - df_overview (pandas DataFrame): Output of `DataProcessor.process_fundamental_data_overview_frame`.
+
+        Returns:
+        - symbols_list (list of str): Symbols passing the screen.
+        """
+        df_overview = kwargs.get("df_overview")
+
+        market_cap = df_overview["MarketCapitalization"]
+        pe_ratio = df_overview["PERatio"]
+        sector = df_overview["Sector"].str.upper()
+        mask = pd.Series(True, index = df_overview.index)
+
+        if "min_market_cap" in self.criteria:
+            mask &= market_cap >= self.criteria["min_market_cap"]
+        if "max_market_cap" in self.criteria:
+            mask &= market_cap <= self.criteria["max_market_cap"]
+        if "sectors" in self.criteria:
+            mask &= sector.isin([value.upper() for value in self.criteria["sectors"]])
+        if "exclude_sectors" in self.criteria:
+            mask &= ~sector.isin([value.upper() for value in self.criteria["exclude_sectors"]])
+        if "min_pe" in self.criteria:
+            mask &= pe_ratio >= self.criteria["min_pe"]
+        if "max_pe" in self.criteria:
+            mask &= pe_ratio <= self.criteria["max_pe"]
+
+        symbols_list = df_overview.loc[mask.fillna(False), "Symbol"].tolist()
+        print(f"Overview screen: {len(symbols_list)} of {len(df_overview)} symbols passed.")
+
+        return symbols_list
+
+    def screen_trends(self, **kwargs):
+        """
+        Applies the growth, margin stability and free cash flow criteria to the trend features.
+        Symbols with a missing value for a criterion, or without trend features at all, do not pass it.
+        Without trend criteria the symbols are returned unchanged, also those without trend features.
+
+        Args:
+        - df_trends (pandas DataFrame): Output of `DataProcessor.process_trend_features_frame`.
+        - symbols_list (list of str, optional): Symbols to screen. Default is the symbols of df_trends.
+
+        Returns:
+        - symbols_list (list of str): Symbols passing the screen, in the order of symbols_list.
+        """
+        df_trends = kwargs.get("df_trends")
+        symbols_list = kwargs.get("symbols_list")
+        if symbols_list is None:
+            symbols_list = df_trends["Symbol"].tolist()
+
+        if not any(key in self.criteria for key in self.trend_criteria):
+            return list(symbols_list)
+
+        mask = pd.Series(True, index = df_trends.index)
+
+        if "min_revenue_cagr" in self.criteria:
+            mask &= df_trends["RevenueCAGR"] >= self.criteria["min_revenue_cagr"]
+        if "min_net_income_cagr" in self.criteria:
+            mask &= df_trends["NetIncomeCAGR"] >= self.criteria["min_net_income_cagr"]
+        if "max_gross_margin_std" in self.criteria:
+            mask &= df_trends["GrossMarginStd"] <= self.criteria["max_gross_margin_std"]
+        if "min_free_cash_flow_positive_share" in self.criteria:
+            mask &= df_trends["FreeCashFlowPositiveShare"] >= self.criteria["min_free_cash_flow_positive_share"]
+
+        passed = set(df_trends.loc[mask, "Symbol"])
+        screened = [symbol for symbol in symbols_list if symbol in passed]
+        print(f"Trend screen: {len(screened)} of {len(symbols_list)} symbols passed.")
+
+        return screened
+
+    @staticmethod
+    def estimate_cost(**kwargs):
+        """
+        Prints and returns the estimated cost of the remaining stages.
+
+        Args:
+        - stage (str): Name of the point in the run the estimate is made at.
+        - api_calls (int): Alpha Vantage requests still to be made (cached symbols excluded).
+        - requests_per_minute (float): Alpha Vantage request budget, used to estimate the fetch time.
+        - llm_requests (int): Companies to be sent to the LLM.
+        - tokens_per_request (int): Estimated prompt plus response tokens per LLM request.
+
+        Returns:
+        - estimate (dict): api_calls, fetch_minutes, llm_requests and llm_tokens.
+        """
+        stage = kwargs.get("stage")
+        api_calls = kwargs.get("api_calls", 0)
+        requests_per_minute = kwargs.get("requests_per_minute")
+        llm_requests = kwargs.get("llm_requests", 0)
+        tokens_per_request = kwargs.get("tokens_per_request", 0)
+
+        estimate = {
+            "api_calls": api_calls,
+            "fetch_minutes": api_calls / requests_per_minute if requests_per_minute else None,
+            "llm_requests": llm_requests,
+            "llm_tokens": llm_requests * tokens_per_request,
+        }
+
+        fetch_minutes = f"{estimate['fetch_minutes']:.1f} min" if estimate["fetch_minutes"] is not None else "n/a"
+        print(f"Cost estimate ({stage}): {api_calls} Alpha Vantage calls (~{fetch_minutes}), "
+              f"{llm_requests} LLM requests, ~{estimate['llm_tokens']} LLM tokens (upper bound).")
+
+        return estimate